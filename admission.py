@@ -0,0 +1,190 @@
+import time
+import threading
+
+from metrics import ENDPOINT_KEY
+
+# Admission control in front of the Flask routes.
+#
+# - Separate concurrency budgets for uploads and for everything else (pages,
+#   downloads), so a handful of large uploads can never occupy every Waitress
+#   thread. When a budget stays full for queue_wait_ms the client gets a fast
+#   503 with Retry-After instead of hanging.
+# - Per-client token buckets for requests/second, answered with 429 +
+#   Retry-After. The teacher's own machine is exempt.
+# - A per-client upload bytes/second budget. Waitress has buffered a body
+#   before any of this runs, so refusing it here would only make the student
+#   send it again; instead the resumable PATCH handler charges each chunk it
+#   stored through upload_wait() and tells the page how long to pause before
+#   the next one.
+
+UPLOAD_PREFIXES = ('/upload', '/uploads', '/webdav')
+UPLOAD_METHODS = ('POST', 'PUT', 'PATCH')
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+
+def retry_after(seconds):
+    # Retry-After value: whole seconds, rounded up, at least 1
+    return str(max(1, int(seconds + 0.999)))
+
+
+class TokenBucket:
+    # Allows a debt: a request is admitted while tokens > 0 and then charged in
+    # full, so a single large upload is not refused just for exceeding the burst.
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self):
+        # Seconds until the debt is paid off, 0 if there is none
+        self._refill(time.monotonic())
+        if self.tokens <= 0:
+            return -self.tokens / self.rate + 1 / self.rate
+        return 0
+
+    def charge(self, amount):
+        # Unconditionally, for work that has already been done
+        self._refill(time.monotonic())
+        self.tokens -= amount
+
+    def take(self, amount):
+        # Returns 0 if admitted, otherwise the seconds to wait
+        wait = self.wait()
+        if not wait:
+            self.tokens -= amount
+        return wait
+
+    def settled(self, now):
+        # Refilled to capacity by now, so forgetting it changes nothing
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class _Release:
+    # Gives the slot back when the server closes the response
+    def __init__(self, app_iter, release):
+        self._app_iter = app_iter
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            self._release()
+
+
+class AdmissionControl:
+    def __init__(self, app, get_settings):
+        # get_settings() -> dict with upload_slots, page_slots, queue_wait_ms,
+        # rate_limit_rps, rate_limit_burst, upload_kbps
+        self.app = app
+        self.get_settings = get_settings
+        self._lock = threading.Lock()
+        self._settings = None
+        self._slots = {}
+        self._buckets = {}
+        self._pruned = time.monotonic()
+
+    def _current(self):
+        settings = self.get_settings()
+        if settings != self._settings:
+            with self._lock:
+                if settings != self._settings:
+                    # In-flight requests keep releasing into the semaphores they took
+                    self._slots = {
+                        'upload': threading.BoundedSemaphore(settings['upload_slots']),
+                        'page': threading.BoundedSemaphore(settings['page_slots']),
+                    }
+                    self._buckets = {}
+                    self._settings = settings
+        return self._settings, self._slots
+
+    def _bucket(self, key, rate, capacity):
+        # caller holds the lock
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rate != rate:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _prune(self, now):
+        # caller holds the lock; forget clients idle for a minute, unless they still owe
+        if now - self._pruned < 60:
+            return
+        self._pruned = now
+        for key in [k for k, b in self._buckets.items() if now - b.updated > 60 and b.settled(now)]:
+            del self._buckets[key]
+
+    def _rate_limit(self, settings, client):
+        # Seconds to wait, 0 if admitted
+        rps = settings['rate_limit_rps']
+        if rps <= 0:
+            return 0
+        with self._lock:
+            self._prune(time.monotonic())
+            return self._bucket((client, 'req'), rps, max(rps, settings['rate_limit_burst'])).take(1)
+
+    def upload_wait(self, client, received=0):
+        # Charge `received` body bytes to the client's upload budget (0 just
+        # looks); returns the seconds it should pause before sending more
+        settings, _ = self._current()
+        kbps = settings['upload_kbps']
+        if kbps <= 0 or client in LOCAL_ADDRS:
+            return 0
+        rate = kbps * 1024
+        with self._lock:
+            self._prune(time.monotonic())
+            bucket = self._bucket((client, 'bytes'), rate, rate * 5)
+            if received:
+                bucket.charge(received)
+            return bucket.wait()
+
+    def _reject(self, start_response, status, wait, message):
+        body = message.encode('utf-8')
+        start_response(status, [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', retry_after(wait)),
+        ])
+        return [body]
+
+    def __call__(self, environ, start_response):
+        settings, slots = self._current()
+        method = environ.get('REQUEST_METHOD', 'GET')
+        path = environ.get('PATH_INFO', '')
+        is_upload = method in UPLOAD_METHODS and path.startswith(UPLOAD_PREFIXES)
+
+        client = environ.get('REMOTE_ADDR', '')
+        if client not in LOCAL_ADDRS:
+            wait = self._rate_limit(settings, client)
+            if wait:
+                environ[ENDPOINT_KEY] = 'rate_limited'  # metrics route label
+                return self._reject(start_response, '429 Too Many Requests', wait,
+                                    'Bạn gửi yêu cầu quá nhanh, vui lòng thử lại sau ít giây.')
+
+        slot = slots['upload' if is_upload else 'page']
+        if not slot.acquire(timeout=settings['queue_wait_ms'] / 1000):
+            environ[ENDPOINT_KEY] = 'overloaded'
+            return self._reject(start_response, '503 Service Unavailable', 2,
+                                'Máy chủ đang bận, vui lòng thử lại sau ít giây.')
+        try:
+            app_iter = self.app(environ, start_response)
+        except Exception:
+            slot.release()
+            raise
+
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(app_iter, file_wrapper):
+            # Keep the server's file fast path; the body is already handed over
+            slot.release()
+            return app_iter
+        return _Release(app_iter, slot.release)
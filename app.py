@@ -1,87 +1,343 @@
 import os
-import json
-import sys
+import tempfile
+import hashlib
+import fnmatch
+import filecmp
+import zipfile
+import mimetypes
+import threading
+from datetime import datetime
+from collections import namedtuple
 from urllib.parse import unquote
-from flask import Flask, render_template, request, send_from_directory, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from werkzeug.security import safe_join
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from werkzeug.utils import secure_filename
+from resumable import ResumableStore, OffsetMismatch
+from naming import NameIndex
+from listing import ListingCache, SORT_KEYS
+from ledger import Ledger
+from zipstream import iter_zip, compress_type
+from filecache import FileCache
+from fileserve import serve_file
+from webdav import WebDAVApp
+from dedup import ContentIndex, link_into
+from metrics import Metrics, ENDPOINT_KEY
+from admission import AdmissionControl, retry_after
+from pagecache import PageCache
+from mirror import Mirror
+from jobs import JobQueue
+from progress import UploadTracker
+from settings import CONFIG_DIR, TEMPLATE_FOLDER, current_config, on_config_change, watch_config
 
-# Determine if running as a script or frozen exe
-if getattr(sys, 'frozen', False):
-    # Running as compiled exe
-    # Templates are bundled inside the exe (in sys._MEIPASS)
-    template_folder = os.path.join(sys._MEIPASS, 'templates')
-    # Config and data should be relative to the executable file
-    BASE_DIR = os.path.dirname(sys.executable)
-else:
-    # Running as python script
-    template_folder = 'templates'
-    BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-
-# Load configuration from file next to the executable/script
-CONFIG_FILE = os.path.join(BASE_DIR, 'config.json')
-
-# Create default config if missing
-if not os.path.exists(CONFIG_FILE):
-    default_config = {
-        "host": "0.0.0.0",
-        "port": 8080,
-        "upload_folder": "data",
-        "assignment_folder": "",
-        "debug": True,
-        "admin_user": "admin",
-        "admin_pass": "123456",
-        "secret_key": "change_this_secret_key"
-    }
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(default_config, f, indent=4)
-
-with open(CONFIG_FILE, 'r') as f:
-    config = json.load(f)
+app = Flask(__name__, template_folder=TEMPLATE_FOLDER)
 
-app = Flask(__name__, template_folder=template_folder)
-app.secret_key = config.get('secret_key', 'default_secret_key')
+# Settings come from an immutable snapshot of config.json (see settings.py);
+# the getters below only read its precomputed fields.
 
 def get_upload_folder():
-    folder_name = config.get('upload_folder', 'data')
-    folder_path = os.path.join(BASE_DIR, folder_name)
-    os.makedirs(folder_path, exist_ok=True)
-    return folder_path
+    # Created when the config is loaded, not on every call
+    return current_config().upload_folder
 
-def get_assignment_folder():
-    folder_path = config.get('assignment_folder', '')
-    if not folder_path or not os.path.exists(folder_path):
+def get_submission_folder():
+    # Where student uploads go right now: the open submission window's folder,
+    # upload_folder itself when no windows are configured, None while closed
+    config = current_config()
+    if not config.timetable:
+        return config.upload_folder
+    window = config.timetable.active()
+    return window.path if window else None
+
+def _admin_folder():
+    # Folder on the admin page: the window picked with /?window= (default: the
+    # open one), or all of upload_folder. Each window folder has its own
+    # cached listing, so past classes do not slow down the current one.
+    config = current_config()
+    name = session.get('window')
+    window = config.timetable.active() if name is None else config.timetable.find(name)
+    return window.path if window else config.upload_folder
+
+def get_max_upload_bytes():
+    # None means no limit
+    return current_config().max_upload_bytes
+
+# In-progress uploads live next to the final files so the commit is a cheap rename
+UPLOAD_TMP_PREFIX = '.upload-'
+UPLOAD_TMP_SUFFIX = '.part'
+
+def is_internal_name(name):
+    # Temp uploads and the .partial folder are ours, never a student's submission
+    # (secure_filename strips leading dots, so real submissions never start with one)
+    return name.startswith('.')
+
+class _HashingFile:
+    # Temp file wrapper that hashes the data as werkzeug writes it
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.sha256.update(data)
+        return self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+def _parse_upload(upload_folder, created):
+    # Let werkzeug write each file part straight into a temp file inside the
+    # upload folder instead of spooling it elsewhere and copying it later.
+    # Every temp file is appended to created, even if parsing fails halfway.
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        try:
+            temp = tempfile.NamedTemporaryFile(
+                'wb+', dir=upload_folder, prefix=UPLOAD_TMP_PREFIX, suffix=UPLOAD_TMP_SUFFIX, delete=False
+            )
+        except FileNotFoundError:
+            # The folder was removed while the server runs
+            os.makedirs(upload_folder, exist_ok=True)
+            temp = tempfile.NamedTemporaryFile(
+                'wb+', dir=upload_folder, prefix=UPLOAD_TMP_PREFIX, suffix=UPLOAD_TMP_SUFFIX, delete=False
+            )
+        created.append(temp)
+        return _HashingFile(temp)
+
+    _, _, files = parse_form_data(
+        request.environ,
+        stream_factory=stream_factory,
+        max_content_length=get_max_upload_bytes(),
+    )
+    return files
+
+def _close_upload(stream):
+    # upload_fsync: "none" (default), "file" (fsync the data) or "full" (data + directory entry)
+    stream.flush()
+    if current_config().upload_fsync in ('file', 'full'):
+        os.fsync(stream.fileno())
+    stream.close()
+
+def _fsync_path(path):
+    if current_config().upload_fsync not in ('file', 'full'):
+        return
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+def _fsync_folder(folder):
+    if current_config().upload_fsync != 'full' or os.name == 'nt':
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _remove_quietly(path):
+    # Temp file that was not moved into place (gone already if it was)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _discard_upload(stream):
+    try:
+        stream.close()
+        os.remove(stream.name)
+    except OSError:
+        pass
+
+name_index = NameIndex()
+listing_cache = ListingCache(hide=is_internal_name, on_rescan=name_index.invalidate)
+
+def _folder_entries(folder, sort='name', reverse=False):
+    # Listing of the upload folder or a window folder; one removed while the
+    # server runs is created again (empty) rather than failing the page
+    try:
+        return listing_cache.entries(folder, sort, reverse)
+    except FileNotFoundError:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError:
+            return []
+        return listing_cache.entries(folder, sort, reverse)
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+Submission = namedtuple('Submission', 'filename sha256 duplicate_of')
+
+def get_dedup_mode():
+    # "link" (hard-link identical content, default), "skip" (keep only the first copy) or "off"
+    return current_config().dedup
+
+def receipt_code(sha256):
+    # Short code shown to the student; the admin can look it up on /duplicates
+    return sha256[:10].upper() if sha256 else ''
+
+def _find_duplicate(upload_folder, temp_path, sha256, size):
+    if not sha256 or get_dedup_mode() == 'off':
+        return None
+    existing = content_index.find(upload_folder, sha256)
+    if existing is None:
         return None
-    return folder_path
+    # The index only says what the name held when it was recorded: compare the
+    # actual bytes before linking to it or dropping the new copy
+    existing_path = os.path.join(upload_folder, existing)
+    try:
+        if os.path.getsize(existing_path) == size and filecmp.cmp(existing_path, temp_path, shallow=False):
+            return existing
+    except OSError:
+        pass
+    # Deleted or changed outside the server
+    content_index.remove(upload_folder, existing)
+    return None
+
+def _store_submission(upload_folder, temp_path, original_filename, sha256=None, client_ip=None):
+    # Move a fully received temp file into place under a free name; returns a Submission
+    size = os.path.getsize(temp_path)
+    duplicate_of = _find_duplicate(upload_folder, temp_path, sha256, size)
+
+    if duplicate_of and get_dedup_mode() == 'skip':
+        # Same content already on disk: only the ledger learns about this copy
+        os.remove(temp_path)
+        ledger.record(original_name=original_filename, stored_name=duplicate_of, folder=upload_folder,
+                      size=size, sha256=sha256, client_ip=client_ip, duplicate_of=duplicate_of)
+        return Submission(duplicate_of, sha256, duplicate_of)
+
+    # A name secure_filename reduces to nothing ("...", non-Latin scripts) still gets a stem
+    filename = secure_filename(original_filename) or secure_filename('file' + os.path.splitext(original_filename)[1]) or 'file'
+
+    # Handle duplicate filenames: the index reserves the name with an exclusive
+    # create, then the data replaces that placeholder atomically.
+    filename = name_index.reserve(upload_folder, filename)
+    target_path = os.path.join(upload_folder, filename)
+    try:
+        if duplicate_of and link_into(os.path.join(upload_folder, duplicate_of), target_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, target_path)
+    except OSError:
+        os.remove(target_path)
+        name_index.release(upload_folder, filename)
+        raise
+    _fsync_folder(upload_folder)
+    listing_cache.add(upload_folder, filename)
+    mirror.enqueue('copy', target_path)
+    if sha256 and not duplicate_of:
+        content_index.add(upload_folder, sha256, filename)
+    ledger.record(original_name=original_filename, stored_name=filename, folder=upload_folder,
+                  size=size, sha256=sha256, client_ip=client_ip, duplicate_of=duplicate_of)
+    return Submission(filename, sha256, duplicate_of)
+
+def _forget_file(folder, filename):
+    # A file (or, over WebDAV, a whole subfolder) was removed by us: free its
+    # name and drop it from the cached listing
+    name_index.release(folder, filename)
+    listing_cache.remove(folder, filename)
+    content_index.remove(folder, filename)
+    content_index.invalidate(os.path.join(folder, filename))  # a window folder's own index
+    ledger.forget(folder, filename)
+    mirror.enqueue('delete', os.path.join(folder, filename))
 
-def reload_config():
-    global config
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r') as f:
-            new_config = json.load(f)
-            config.clear()
-            config.update(new_config)
-            app.secret_key = config.get('secret_key', 'default_secret_key')
+def get_resumable_expire_seconds():
+    return current_config().resumable_expire_seconds
+
+resumable_store = ResumableStore(get_resumable_expire_seconds())
+
+def get_ledger_path():
+    return current_config().ledger_path
+
+ledger = Ledger(get_ledger_path())
+content_index = ContentIndex(ledger.known_hashes)
+
+def get_mirror_folder():
+    # Second copy of every submission ('' = off); never the upload folder itself
+    return current_config().mirror_folder
+
+# Pending copies are kept next to config.json, so they survive a restart
+mirror = Mirror(os.path.join(CONFIG_DIR, 'mirror.db'), get_upload_folder, get_mirror_folder)
+
+def get_assignment_folder():
+    # None when not configured; a folder that is missing (USB stick pulled)
+    # shows up as OSError / 404 where it is read, not as an extra stat here
+    return current_config().assignment_folder or None
+
+page_cache = PageCache()
+
+@app.template_filter('filesize')
+def filesize_filter(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+@app.template_filter('filetime')
+def filetime_filter(mtime):
+    return datetime.fromtimestamp(mtime).strftime('%H:%M:%S %d/%m/%Y')
 
 @app.route('/')
 def index():
+    timetable = current_config().timetable
     if not session.get('logged_in'):
         # For students: show upload form only
-        return render_template('index.html', logged_in=False)
-    
-    upload_folder = get_upload_folder()
-    if os.path.exists(upload_folder):
-        files = os.listdir(upload_folder)
-        files.sort()
-    else:
-        files = []
-    return render_template('index.html', files=files, logged_in=True)
+        window = timetable.active()
+
+        def render():
+            return render_template('index.html', logged_in=False, windows=timetable.windows, open_window=window)
+        if session.get('_flashes'):
+            # An upload receipt is waiting; render it once, uncached
+            return render()
+        page = page_cache.get('index', (timetable, window), render)
+        return page_cache.respond(request, page)
+
+    # Which folder to show: "*" follows the open window, "" is all of upload_folder
+    if request.args.get('window') == '*':
+        session.pop('window', None)
+    elif 'window' in request.args:
+        session['window'] = request.args['window']
+
+    sort = request.args.get('sort', 'name')
+    if sort not in SORT_KEYS:
+        sort = 'name'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    per_page = min(max(request.args.get('per_page', 100, type=int), 10), 1000)
+
+    folder = _admin_folder()
+    entries = _folder_entries(folder, sort, order == 'desc')
+    pages = max(1, -(-len(entries) // per_page))
+    page = min(max(request.args.get('page', 1, type=int), 1), pages)
+    files = entries[(page - 1) * per_page:page * per_page]
+    return render_template('index.html', files=files, logged_in=True, total=len(entries),
+                           sort=sort, order=order, page=page, pages=pages, per_page=per_page,
+                           windows=timetable.windows, open_window=timetable.active(),
+                           window_choice=session.get('window'))
+
+@app.before_request
+def _tag_endpoint():
+    # Route label for the metrics middleware
+    request.environ[ENDPOINT_KEY] = request.endpoint or 'not_found'
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text format; for the teacher or a scraper on this machine
+    if not session.get('logged_in') and request.remote_addr not in ['127.0.0.1', '::1']:
+        return "Forbidden", 403
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def check_admin(username, password):
+    config = current_config()
+    return username == config.admin_user and password == config.admin_pass
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        if username == config.get('admin_user', 'admin') and password == config.get('admin_pass', '123456'):
+        if check_admin(username, password):
             session['logged_in'] = True
             return redirect(url_for('index'))
         else:
@@ -93,89 +349,599 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('index'))
 
+def _wants_json():
+    # The page's own scripts ask for JSON; a plain form post gets a redirect + flash
+    return request.accept_mimetypes.best == 'application/json'
+
+def _submission_message(submission):
+    receipt = receipt_code(submission.sha256)
+    if submission.duplicate_of and submission.filename == submission.duplicate_of:
+        return f'File này đã được nộp trước đó ({submission.filename}), không lưu thêm bản sao. Mã xác nhận: {receipt}'
+    return f'Nộp file thành công: {submission.filename} (mã xác nhận: {receipt})'
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
-        return redirect(url_for('index'))
-    
-    file = request.files['file']
-    if file.filename == '':
+    # Reject oversized submissions before touching the body
+    limit = get_max_upload_bytes()
+    if limit and request.content_length and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    # ...and late ones: outside every submission window there is nowhere to put them
+    upload_folder = get_submission_folder()
+    if upload_folder is None:
+        if _wants_json():
+            return jsonify(error='Đã hết thời gian nộp bài.'), 403
+        flash('Đã hết thời gian nộp bài.')
         return redirect(url_for('index'))
-        
-    if file:
-        filename = secure_filename(file.filename)
-        upload_folder = get_upload_folder()
-        
-        # Handle duplicate filenames
-        name, ext = os.path.splitext(filename)
-        counter = 1
-        while os.path.exists(os.path.join(upload_folder, filename)):
-            filename = f"{name}_{counter:02d}{ext}"
-            counter += 1
-            
-        file.save(os.path.join(upload_folder, filename))
-        flash(f'Nộp file thành công: {filename}')
+
+    created = []
+    try:
+        files = _parse_upload(upload_folder, created)
+        file = files.get('file')
+        if not file or file.filename == '':
+            if _wants_json():
+                return jsonify(error='Chưa chọn file.'), 400
+            return redirect(url_for('index'))
+
+        # The data is already on disk: finish it and move it into place atomically
+        _close_upload(file.stream)
+        submission = _store_submission(upload_folder, file.stream.name, file.filename,
+                                       sha256=file.stream.sha256.hexdigest(), client_ip=request.remote_addr)
+        if _wants_json():
+            return jsonify(filename=submission.filename, receipt=receipt_code(submission.sha256),
+                           message=_submission_message(submission))
+        flash(_submission_message(submission))
         return redirect(url_for('index'))
+    finally:
+        # Drop temp files of anything we did not keep (extra parts, errors, bodies cut off mid-parse)
+        for temp in created:
+            if os.path.exists(temp.name):
+                _discard_upload(temp)
+
+# Shared by the worker processes, next to config.json like the other databases
+upload_tracker = UploadTracker(os.path.join(CONFIG_DIR, 'uploads.db'))
+
+# Resumable uploads (tus-style): create -> PATCH chunks at an offset -> finish.
+# A dropped connection only costs the missing bytes: the client asks for the
+# current offset with HEAD and continues from there.
+
+LATE_GRACE_SECONDS = 2 * 60  # a started upload may still send data this long after its window closed
+
+def _too_late(upload_id, target):
+    # The upload's window closed more than LATE_GRACE_SECONDS ago: drop what it sent
+    if current_config().timetable.accepts(target, grace=LATE_GRACE_SECONDS):
+        return False
+    resumable_store.discard(get_upload_folder(), upload_id)
+    upload_tracker.end(upload_id)
+    return True
+
+def _resumable_headers(offset, length):
+    return {'Upload-Offset': str(offset), 'Upload-Length': str(length), 'Cache-Control': 'no-store'}
+
+@app.route('/uploads', methods=['POST'])
+def resumable_create():
+    try:
+        length = int(request.headers.get('Upload-Length', ''))
+    except ValueError:
+        return "Missing Upload-Length", 400
+    if length < 0:
+        return "Invalid Upload-Length", 400
+    limit = get_max_upload_bytes()
+    if limit and length > limit:
+        raise RequestEntityTooLarge()
+
+    filename = request.headers.get('Upload-Filename', '')
+    filename = unquote(filename)
+    if not filename:
+        return "Missing Upload-Filename", 400
+    # The window is checked here and again, with a short grace period, as data arrives
+    target = get_submission_folder()
+    if target is None:
+        return "Đã hết thời gian nộp bài", 403
+
+    upload_id = resumable_store.create(get_upload_folder(), filename, length, target)
+    upload_tracker.begin(upload_id, filename, request.remote_addr, length)
+    headers = _resumable_headers(0, length)
+    headers['Location'] = url_for('resumable_patch', upload_id=upload_id)
+    return '', 201, headers
+
+@app.route('/uploads/<upload_id>', methods=['HEAD'])
+def resumable_status(upload_id):
+    state = resumable_store.status(get_upload_folder(), upload_id)
+    if state is None:
+        return '', 404
+    offset, length, _, _ = state
+    return '', 200, _resumable_headers(offset, length)
+
+@app.route('/uploads/<upload_id>', methods=['PATCH'])
+def resumable_patch(upload_id):
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return "Missing Upload-Offset", 400
+    upload_folder = get_upload_folder()
+    state = resumable_store.status(upload_folder, upload_id)
+    if state is None:
+        return '', 404
+    _, length, filename, target = state
+    if _too_late(upload_id, target):
+        return "Đã hết thời gian nộp bài", 403
+    # upload_kbps: the page pauses as told after each chunk; a client that does not is refused
+    wait = admission.upload_wait(request.remote_addr)
+    if wait:
+        return "Bạn gửi quá nhanh, vui lòng thử lại sau ít giây.", 429, {'Retry-After': retry_after(wait)}
+    try:
+        new_offset = resumable_store.append(upload_folder, upload_id, offset, request.stream)
+    except OffsetMismatch as e:
+        return "Offset mismatch", 409, {'Upload-Offset': str(e.args[0])}
+    if new_offset is None:
+        return '', 404
+    if not upload_tracker.update(upload_id, new_offset):
+        # Created before a restart or idle for a while
+        upload_tracker.begin(upload_id, filename, request.remote_addr, length, new_offset)
+    headers = _resumable_headers(new_offset, length)
+    wait = admission.upload_wait(request.remote_addr, new_offset - offset)
+    if wait:
+        headers['Retry-After'] = retry_after(wait)
+    return '', 204, headers
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def resumable_cancel(upload_id):
+    resumable_store.discard(get_upload_folder(), upload_id)
+    upload_tracker.end(upload_id)
+    return '', 204
+
+@app.route('/uploads/<upload_id>/finish', methods=['POST'])
+def resumable_finish(upload_id):
+    upload_folder = get_upload_folder()
+    state = resumable_store.status(upload_folder, upload_id)
+    if state is None:
+        return '', 404
+    if _too_late(upload_id, state[3]):
+        return "Đã hết thời gian nộp bài", 403
+    try:
+        taken = resumable_store.take(upload_folder, upload_id)
+    except OffsetMismatch as e:
+        return "Upload incomplete", 409, {'Upload-Offset': str(e.args[0])}
+    if taken is None:
+        return '', 404
+    upload_tracker.end(upload_id)
+    part_path, original_filename, sha256, target = taken
+    try:
+        _fsync_path(part_path)
+        if sha256 is None:
+            sha256 = _file_sha256(part_path)
+        os.makedirs(target, exist_ok=True)  # the window folder may have been removed since the upload began
+        submission = _store_submission(target, part_path, original_filename,
+                                       sha256=sha256, client_ip=request.remote_addr)
+    except BaseException:
+        # The metadata is gone already, so expire() would never find this file
+        _remove_quietly(part_path)
+        raise
+    return jsonify(filename=submission.filename, receipt=receipt_code(submission.sha256),
+                   message=_submission_message(submission))
+
+@app.route('/uploads/active')
+def active_uploads():
+    # Uploads in flight with their rate and ETA, polled by the admin page
+    if not session.get('logged_in'):
+        return "Forbidden", 403
+    response = jsonify(uploads=upload_tracker.active())
+    response.cache_control.no_store = True
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    limit = get_max_upload_bytes()
+    if limit:
+        return f"File quá lớn (tối đa {limit // (1024 * 1024)} MB)", 413
+    return "File quá lớn", 413
 
 @app.route('/download/<filename>')
 def download_file(filename):
     if not session.get('logged_in'):
         return redirect(url_for('login'))
-    return send_from_directory(get_upload_folder(), filename)
+    file_path = safe_join(_admin_folder(), filename)
+    if file_path is None or not os.path.isfile(file_path):
+        return "File not found", 404
+    return serve_file(request.environ, file_path)
+
+def _parse_filter_time(value):
+    # Accepts "HH:MM" (today) or a datetime-local value "YYYY-MM-DDTHH:MM"
+    if not value:
+        return None
+    try:
+        if len(value) <= 5:
+            t = datetime.strptime(value, '%H:%M').time()
+            return datetime.combine(datetime.now().date(), t).timestamp()
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+@app.route('/submissions')
+def submissions():
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+
+    filters = {
+        'name': request.args.get('q', '').strip(),
+        'ip': request.args.get('ip', '').strip(),
+        'since': request.args.get('since', ''),
+        'until': request.args.get('until', ''),
+    }
+    cursor = None
+    after = request.args.get('after', '')
+    if after:
+        try:
+            created_at, row_id = after.split(':')
+            cursor = (float(created_at), int(row_id))
+        except ValueError:
+            cursor = None
+
+    rows, next_cursor = ledger.search(
+        name=filters['name'] or None,
+        client_ip=filters['ip'] or None,
+        since=_parse_filter_time(filters['since']),
+        until=_parse_filter_time(filters['until']),
+        cursor=cursor,
+        limit=min(max(request.args.get('limit', 100, type=int), 10), 1000),
+    )
+    next_after = f"{next_cursor[0]!r}:{next_cursor[1]}" if next_cursor else None
+    return render_template('submissions.html', rows=rows, filters=filters, next_after=next_after)
+
+@app.route('/duplicates')
+def duplicates():
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+
+    groups = ledger.duplicate_groups(_admin_folder())
+
+    # Receipt check: does the file on disk still match what the student was told?
+    receipt = request.args.get('receipt', '').strip().lower()
+    checks = []
+    if receipt:
+        for row in ledger.find_receipt(receipt):
+            path = os.path.join(row['folder'], row['stored_name'])
+            if not os.path.isfile(path):
+                status = 'missing'
+            elif _file_sha256(path) == row['sha256']:
+                status = 'ok'
+            else:
+                status = 'changed'
+            checks.append((row, status))
+    return render_template('duplicates.html', groups=groups, receipt=receipt.upper(), checks=checks)
+
+@app.route('/download_all', methods=['GET', 'POST'])
+def download_all():
+    # ZIP of every submission, of those matching ?pattern= (glob), or of the
+    # files ticked on the admin page (POST files=...). Streamed while it is built.
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+
+    upload_folder = _admin_folder()
+    names = [e.name for e in _folder_entries(upload_folder) if not e.is_dir]
+    if request.method == 'POST':
+        selected = set(request.form.getlist('files'))
+        names = [n for n in names if n in selected]
+    pattern = request.values.get('pattern', '').strip()
+    if pattern:
+        pattern = pattern.lower()
+        names = [n for n in names if fnmatch.fnmatchcase(n.lower(), pattern)]
+    if not names:
+        flash('Không có file nào để tải về.')
+        return redirect(url_for('index'))
+
+    archive_name = f"BaiNop_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+    files = [(os.path.join(upload_folder, n), n) for n in names]
+    return Response(
+        iter_zip(files),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{archive_name}"', 'Cache-Control': 'no-store'},
+    )
 
 @app.route('/baitap')
 def baitap():
     # Trang download đề bài - dành cho học sinh
     assignment_folder = get_assignment_folder()
-    assignment_files = []
+    generation = None
     if assignment_folder:
         try:
-            assignment_files = os.listdir(assignment_folder)
-            assignment_files.sort()
-        except:
+            generation = listing_cache.generation(assignment_folder)
+        except OSError:
             pass
-    return render_template('baitap.html', assignment_files=assignment_files)
+
+    def render():
+        assignment_files = []
+        if assignment_folder:
+            try:
+                assignment_files = [e.name for e in listing_cache.entries(assignment_folder) if not e.is_dir]
+            except OSError:
+                pass
+        return render_template('baitap.html', assignment_files=assignment_files)
+
+    # Re-rendered only when the folder setting or its contents change
+    page = page_cache.get('baitap', (assignment_folder, generation), render)
+    return page_cache.respond(request, page)
+
+def get_assignment_cache_bytes():
+    return current_config().assignment_cache_bytes
+
+assignment_cache = FileCache(get_assignment_cache_bytes())
+
+# (folder, filename) -> real path, None (missing) or False (escapes the folder);
+# rebuilt whenever the folder's listing generation changes
+_assignment_paths = {}
+_assignment_paths_generation = None
+_assignment_paths_lock = threading.Lock()
+
+def _resolve_assignment(assignment_folder, real_folder, filename):
+    global _assignment_paths, _assignment_paths_generation
+    generation = listing_cache.generation(assignment_folder)
+    key = (assignment_folder, filename)
+    with _assignment_paths_lock:
+        if generation != _assignment_paths_generation:
+            _assignment_paths = {}
+            _assignment_paths_generation = generation
+        if key in _assignment_paths:
+            return _assignment_paths[key]
+
+    # Security check 1: ensure file exists
+    file_path = os.path.join(assignment_folder, filename)
+    if not filename or not os.path.isfile(file_path):
+        result = None
+    else:
+        # Security check 2: ensure resolved path is within assignment folder (prevent symlink attacks)
+        real_path = os.path.realpath(file_path)
+        result = real_path if os.path.commonpath([real_path, real_folder]) == real_folder else False
+
+    with _assignment_paths_lock:
+        if generation == _assignment_paths_generation:
+            _assignment_paths[key] = result
+    return result
 
 @app.route('/download_assignment/<path:filename>')
 def download_assignment(filename):
     # Allow both logged-in teachers and students to download assignments
-    assignment_folder = get_assignment_folder()
+    config = current_config()
+    assignment_folder = config.assignment_folder
     if not assignment_folder:
         return "Assignment folder not configured", 404
-    
+
     # URL decode the filename (convert %20 to space, etc)
     decoded_filename = unquote(filename)
-    
+
     # Get just the filename part (prevent path traversal like ../)
     just_filename = os.path.basename(decoded_filename)
-    
-    # Build the full path
-    file_path = os.path.join(assignment_folder, just_filename)
-    
-    # Security check 1: ensure file exists
-    if not os.path.exists(file_path) or not os.path.isfile(file_path):
+
+    # Existence and symlink checks are done once per file and folder listing generation
+    try:
+        real_path = _resolve_assignment(assignment_folder, config.assignment_realpath, just_filename)
+    except OSError:
+        real_path = None  # folder missing
+    if real_path is None:
         return "File not found", 404
-    
-    # Security check 2: ensure resolved path is within assignment folder (prevent symlink attacks)
-    real_path = os.path.realpath(file_path)
-    real_folder = os.path.realpath(assignment_folder)
-    if not real_path.startswith(real_folder):
+    if real_path is False:
         return "Forbidden", 403
-    
-    # Use send_from_directory with the actual filename
-    return send_from_directory(assignment_folder, just_filename)
+
+    try:
+        st = os.stat(real_path)
+    except OSError:
+        return "File not found", 404
+
+    mimetype = mimetypes.guess_type(just_filename)[0] or 'application/octet-stream'
+    cached = assignment_cache.get(real_path, st)
+    if cached is None:
+        # Too large for the cache: stream it from disk
+        return serve_file(request.environ, real_path, st, mimetype=mimetype)
+
+    response = Response(cached.data, mimetype=mimetype)
+    response.set_etag(cached.etag)
+    response.last_modified = st.st_mtime
+    response.cache_control.no_cache = True
+    return response.make_conditional(request, accept_ranges=True, complete_length=cached.size)
 
 @app.route('/delete/<filename>', methods=['POST'])
 def delete_file(filename):
     if not session.get('logged_in'):
         return redirect(url_for('login'))
         
-    file_path = os.path.join(get_upload_folder(), filename)
-    if os.path.exists(file_path):
+    upload_folder = _admin_folder()
+    file_path = os.path.join(upload_folder, filename)
+    if os.path.isdir(file_path):
+        # Window and move-target folders are listed too; they are not removed from here
+        flash(f'Không xóa thư mục: {filename}')
+    elif os.path.exists(file_path):
         os.remove(file_path)
+        _forget_file(upload_folder, filename)
         flash(f'Đã xóa file: {filename}')
     return redirect(url_for('index'))
 
+# Bulk operations on the admin page: a selection (ticked files) or a filter is
+# resolved to a list of names here, then deleted / moved / zipped by a
+# background job. The listing is refreshed once when the job ends.
+BULK_ACTIONS = ('delete', 'move', 'archive')
+
+bulk_jobs = JobQueue(os.path.join(CONFIG_DIR, 'jobs.db'))
+
+def _is_spare_copy(folder, name, row):
+    # row: the name's latest ledger row (see Ledger.duplicate_copies). True only if
+    # the file still holds that content and another name still holds the same bytes,
+    # so removing this one loses nothing. Names get reused, so the ledger alone is not enough.
+    path = os.path.join(folder, name)
+    original = os.path.join(folder, row['duplicate_of'])
+    try:
+        if os.path.getsize(path) != row['size'] or os.path.getsize(original) != row['size']:
+            return False
+        if os.path.samefile(path, original):
+            return True  # hard link made by dedup: the other name keeps the data
+        return _file_sha256(path) == row['sha256'] and filecmp.cmp(path, original, shallow=False)
+    except OSError:
+        return False
+
+def _bulk_selection(upload_folder, form):
+    # (names the request picks or None if it picks nothing at all,
+    #  {name: ledger row} when the duplicates filter chose them, else None)
+    entries = [e for e in _folder_entries(upload_folder) if not e.is_dir]
+    selected = set(form.getlist('files'))
+    if selected:
+        return [e.name for e in entries if e.name in selected], None
+
+    pattern = form.get('pattern', '').strip().lower()
+    before = _parse_filter_time(form.get('before', ''))
+    min_kb = form.get('min_kb', type=float)
+    max_kb = form.get('max_kb', type=float)
+    duplicates = form.get('duplicates') == '1'
+    if not (pattern or before or min_kb is not None or max_kb is not None or duplicates):
+        return None, None
+
+    copies = ledger.duplicate_copies(upload_folder) if duplicates else None
+    names = []
+    for e in entries:
+        if pattern and not fnmatch.fnmatchcase(e.name.lower(), pattern):
+            continue
+        if before and e.mtime >= before:
+            continue
+        if min_kb is not None and e.size < min_kb * 1024:
+            continue
+        if max_kb is not None and e.size > max_kb * 1024:
+            continue
+        if copies is not None and not (e.name in copies and _is_spare_copy(upload_folder, e.name, copies[e.name])):
+            continue
+        names.append(e.name)
+    return names, copies
+
+def _bulk_delete(upload_folder, copies=None):
+    # copies: delete only files that are still spare duplicate copies when their turn comes
+    def step(name):
+        path = os.path.join(upload_folder, name)
+        if copies is not None and not _is_spare_copy(upload_folder, name, copies[name]):
+            raise OSError('không còn là bản trùng, đã giữ lại')
+        os.remove(path)
+        name_index.release(upload_folder, name)
+        content_index.remove(upload_folder, name)
+        ledger.forget(upload_folder, name)
+        mirror.enqueue('delete', path)
+    return step, None
+
+def _bulk_move(upload_folder, subfolder):
+    target_folder = os.path.join(upload_folder, subfolder)
+    os.makedirs(target_folder, exist_ok=True)
+    mirror.enqueue('copy', target_folder)
+
+    def step(name):
+        source = os.path.join(upload_folder, name)
+        if not os.path.isfile(source):
+            raise FileNotFoundError(2, 'No such file', source)
+        # Same rules as an upload: never overwrite a file already in the subfolder
+        target_name = name_index.reserve(target_folder, name)
+        target = os.path.join(target_folder, target_name)
+        try:
+            os.replace(source, target)
+        except OSError:
+            os.remove(target)
+            name_index.release(target_folder, target_name)
+            raise
+        name_index.release(upload_folder, name)
+        content_index.remove(upload_folder, name)
+        ledger.forget(upload_folder, name)
+        mirror.enqueue('delete', source)
+        mirror.enqueue('copy', target)
+
+    def finish(done, failed, error):
+        listing_cache.invalidate(target_folder)
+    return step, finish
+
+def _bulk_archive(upload_folder):
+    # The archive is built under a temp name, then appears in the list like a submission
+    archive_name = name_index.reserve(upload_folder, f"BaiNop_{datetime.now().strftime('%Y%m%d_%H%M')}.zip")
+    temp = tempfile.NamedTemporaryFile('wb', dir=upload_folder, prefix=UPLOAD_TMP_PREFIX,
+                                       suffix=UPLOAD_TMP_SUFFIX, delete=False)
+    zf = zipfile.ZipFile(temp, 'w', allowZip64=True, strict_timestamps=False)
+
+    def step(name):
+        zf.write(os.path.join(upload_folder, name), name, compress_type=compress_type(name))
+
+    def discard():
+        # No archive after all: drop the partial zip and the reserved name
+        try:
+            zf.close()
+        except Exception:  # a zip that already failed to close
+            pass
+        temp.close()
+        _remove_quietly(temp.name)
+        _remove_quietly(os.path.join(upload_folder, archive_name))
+        name_index.release(upload_folder, archive_name)
+
+    def finish(done, failed, error):
+        archive_path = os.path.join(upload_folder, archive_name)
+        if error is not None:
+            discard()
+            return None
+        try:
+            zf.close()
+            _close_upload(temp)
+            os.replace(temp.name, archive_path)
+        except BaseException:
+            discard()
+            raise
+        mirror.enqueue('copy', archive_path)
+        return archive_name
+    return step, finish
+
+@app.route('/bulk', methods=['POST'])
+def bulk():
+    # Starts a job; answers JSON to the admin page's script, a redirect otherwise
+    if not session.get('logged_in'):
+        return redirect(url_for('login'))
+    wants_json = _wants_json()
+
+    def fail(message):
+        if wants_json:
+            return jsonify(error=message), 400
+        flash(message)
+        return redirect(url_for('index'))
+
+    action = request.form.get('action', '')
+    if action not in BULK_ACTIONS:
+        return fail('Thao tác không hợp lệ.')
+    upload_folder = _admin_folder()
+    names, copies = _bulk_selection(upload_folder, request.form)
+    if names is None:
+        return fail('Hãy chọn file hoặc nhập điều kiện lọc.')
+    if not names:
+        return fail('Không có file nào khớp điều kiện.')
+
+    if action == 'delete':
+        step, finish = _bulk_delete(upload_folder, copies)
+    elif action == 'move':
+        subfolder = secure_filename(request.form.get('target', ''))
+        if not subfolder:
+            return fail('Hãy nhập tên thư mục đích.')
+        step, finish = _bulk_move(upload_folder, subfolder)
+    else:
+        step, finish = _bulk_archive(upload_folder)
+
+    def finish_job(done, failed, error):
+        try:
+            return finish(done, failed, error) if finish else None
+        finally:
+            # Once per job instead of once per file
+            listing_cache.invalidate(upload_folder)
+
+    job_id = bulk_jobs.submit(action, names, step, finish_job)
+    if wants_json:
+        return jsonify(job=job_id, total=len(names)), 202
+    flash(f'Đang xử lý {len(names)} file...')
+    return redirect(url_for('index'))
+
+@app.route('/bulk/<job_id>')
+def bulk_status(job_id):
+    if not session.get('logged_in'):
+        return "Forbidden", 403
+    status = bulk_jobs.status(job_id)
+    if status is None:
+        return jsonify(error='not found'), 404
+    return jsonify(status)
+
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
     # Only allow shutdown from localhost for security
@@ -188,3 +954,89 @@ def shutdown():
     
     shutdown_func()
     return 'Server shutting down...'
+
+# WebDAV shares: /webdav is the students' write-only drop box, /webdav-admin
+# the teacher's full view (Basic auth with the admin credentials)
+def _webdav_store(temp_path, filename, client_ip, sha256):
+    # The temp file is already in the student share's root, the open window's folder
+    try:
+        return _store_submission(os.path.dirname(temp_path), temp_path, filename,
+                                 sha256=sha256, client_ip=client_ip).filename
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+
+def _webdav_written(path):
+    # Admin share PUT replaced a file in place: whatever the name held before is gone
+    folder, name = os.path.split(path)
+    content_index.remove(folder, name)
+    ledger.forget(folder, name)
+    mirror.enqueue('copy', path)
+
+_webdav_options = dict(
+    store=_webdav_store,
+    listing=listing_cache,
+    is_hidden=is_internal_name,
+    get_max_bytes=get_max_upload_bytes,
+    on_delete=_forget_file,
+    on_write=_webdav_written,
+)
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {
+    '/webdav': WebDAVApp(get_root=get_submission_folder, **_webdav_options),
+    '/webdav-admin': WebDAVApp(get_root=get_upload_folder, admin=True, check_auth=check_admin, **_webdav_options),
+})
+
+def get_threads():
+    return current_config().threads
+
+def get_server_mode():
+    # "asgi" runs the app on uvicorn through asgi.py; anything else means Waitress
+    return current_config().server_mode
+
+def get_admission_settings():
+    # Read-only mapping, validated once per config load
+    return current_config().admission
+
+admission = AdmissionControl(app.wsgi_app, get_admission_settings)
+app.wsgi_app = admission
+
+metrics = Metrics(app.wsgi_app)
+app.wsgi_app = metrics
+
+def get_workers():
+    return current_config().workers
+
+_cached_assignment_folder = None
+
+def _apply_config(config):
+    # Runs on every load of config.json: push the new values into the
+    # long-lived objects that copied them at startup
+    global _cached_assignment_folder
+    app.secret_key = config.secret_key
+    resumable_store.expire_seconds = config.resumable_expire_seconds
+    if config.assignment_folder != _cached_assignment_folder or config.assignment_cache_bytes < assignment_cache.max_bytes:
+        # Files of the previous folder, or more than the new budget allows
+        assignment_cache.clear()
+        _cached_assignment_folder = config.assignment_folder
+    assignment_cache.max_bytes = config.assignment_cache_bytes
+    # Pages rendered from the previous settings
+    page_cache.invalidate()
+    for folder in [config.upload_folder] + [w.path for w in config.timetable.windows]:
+        try:
+            os.makedirs(folder, exist_ok=True)
+        except OSError as e:
+            print(f"Cannot create upload folder {folder}: {e}")
+
+_apply_config(current_config())
+on_config_change(_apply_config)
+# Edits to config.json (from the launcher or by hand) apply without a restart
+watch_config()
+
+def attach_worker(worker_id, generation):
+    # Pre-fork mode: called in each worker process before it starts serving.
+    # Sessions need nothing here (signed cookies, same secret_key everywhere);
+    # the listing cache follows changes made by the other workers.
+    metrics.worker = worker_id
+    listing_cache.attach(generation)
+    if worker_id == 0:
+        mirror.start()
@@ -0,0 +1,260 @@
+import io
+import sys
+import asyncio
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Asyncio serving mode (server_mode = "asgi"): the same Flask app, run behind
+# uvicorn through a small WSGI -> ASGI bridge.
+#
+# - Request bodies are received on the event loop and spooled (in memory,
+#   then to a temp file written from a worker thread), so a slow upload costs
+#   a coroutine, not a thread.
+# - The Flask handler runs on a bounded thread pool only once the body is
+#   complete; response chunks are pulled from the WSGI iterator one at a time
+#   on that pool and sent with backpressure, so a slow reader holds no thread
+#   between chunks.
+# - wsgi.file_wrapper bodies (downloads) bypass the pool entirely: blocks are
+#   read with asyncio.to_thread and sent as the client drains them.
+# - Large bodies are reported to the upload tracker (progress.py) while they
+#   arrive; PATCH chunks are left to the resumable upload route, which
+#   reports the whole file.
+#
+# uvicorn is optional and only imported when this mode is selected.
+
+SERVER_SOFTWARE = 'webdav-manager-asgi'
+BLOCK_SIZE = 256 * 1024
+SPOOL_SIZE = 1024 * 1024  # bodies up to this size stay in memory
+TRACK_INTERVAL = 0.5  # seconds between upload tracker reports for one body
+
+
+class FileWrapper:
+    # wsgi.file_wrapper: like Waitress', the body stops at Content-Length
+    def __init__(self, f, block_size=BLOCK_SIZE):
+        self.f = f
+        self.block_size = block_size
+
+    def __iter__(self):
+        # Only used if a middleware unwraps the response; the bridge reads self.f directly
+        while True:
+            chunk = self.f.read(self.block_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self.f.close()
+
+
+class _Body:
+    # Request body spool: memory first, a temp file once it grows past SPOOL_SIZE
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.file = None
+
+    async def write(self, chunk):
+        self.size += len(chunk)
+        if self.file is None and self.size <= SPOOL_SIZE:
+            self.parts.append(chunk)
+            return
+        if self.file is None:
+            self.file = await asyncio.to_thread(tempfile.TemporaryFile)
+            chunk = b''.join(self.parts) + chunk
+            self.parts = []
+        await asyncio.to_thread(self.file.write, chunk)
+
+    async def stream(self):
+        if self.file is None:
+            return io.BytesIO(b''.join(self.parts))
+        await asyncio.to_thread(self.file.seek, 0)
+        return self.file
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def _status_code(status):
+    return int(status.split(' ', 1)[0])
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+class WSGIBridge:
+    def __init__(self, wsgi_app, threads=16, max_body=0, tracker=None):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.tracker = tracker
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-worker')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        headers = [(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']]
+        content_length = next((v for k, v in headers if k.lower() == 'content-length'), None)
+        if self.max_body and content_length and content_length.isdigit() and int(content_length) > self.max_body:
+            await self._plain(send, 413, b'Request Entity Too Large')
+            return
+
+        body = _Body()
+        tracked = None
+        reported = 0.0
+        if (self.tracker is not None and scope['method'] != 'PATCH'
+                and content_length and content_length.isdigit() and int(content_length) > SPOOL_SIZE):
+            tracked = secrets.token_hex(8)
+            # The tracker writes to SQLite, which may wait on other workers: never on the loop
+            await asyncio.to_thread(self.tracker.begin, tracked, scope['path'],
+                                    (scope.get('client') or ('',))[0], int(content_length))
+        try:
+            try:
+                while True:
+                    message = await receive()
+                    if message['type'] == 'http.disconnect':
+                        return
+                    chunk = message.get('body', b'')
+                    if chunk:
+                        await body.write(chunk)
+                        if tracked is not None and time.monotonic() - reported >= TRACK_INTERVAL:
+                            await asyncio.to_thread(self.tracker.update, tracked, body.size)
+                            reported = time.monotonic()
+                        if self.max_body and body.size > self.max_body:
+                            await self._plain(send, 413, b'Request Entity Too Large')
+                            return
+                    if not message.get('more_body', False):
+                        break
+            finally:
+                if tracked is not None:
+                    await asyncio.to_thread(self.tracker.end, tracked)
+
+            environ = self._environ(scope, headers, await body.stream(), body.size)
+            # Notices a client that goes away while its response is still being sent
+            disconnected = asyncio.ensure_future(receive())
+            try:
+                await self._respond(environ, send, disconnected)
+            finally:
+                disconnected.cancel()
+        finally:
+            body.close()
+
+    def _environ(self, scope, headers, stream, length):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            # WSGI carries the decoded path as latin-1 code points of the UTF-8 bytes
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'SERVER_SOFTWARE': SERVER_SOFTWARE,
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': stream,
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            'wsgi.file_wrapper': FileWrapper,
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif key != 'CONTENT_LENGTH':
+                key = 'HTTP_' + key
+                environ[key] = environ[key] + ',' + value if key in environ else value
+        return environ
+
+    async def _respond(self, environ, send, disconnected):
+        loop = asyncio.get_running_loop()
+        started = {}
+        written = []
+
+        def start_response(status, response_headers, exc_info=None):
+            if exc_info and started.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            started['status'] = status
+            started['headers'] = response_headers
+            return written.append
+
+        try:
+            result = await loop.run_in_executor(self.executor, self.wsgi_app, environ, start_response)
+        except Exception:
+            await self._plain(send, 500, b'Internal Server Error')
+            raise
+
+        async def send_start():
+            started['sent'] = True
+            await send({'type': 'http.response.start', 'status': _status_code(started['status']),
+                        'headers': _encode_headers(started['headers'])})
+
+        try:
+            if isinstance(result, FileWrapper):
+                await send_start()
+                await self._send_file(result, started['headers'], send, disconnected)
+                return
+
+            iterator = iter(result)
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+                if written:
+                    chunk = b''.join(written) + (chunk or b'')
+                    written.clear()
+                if chunk is None:
+                    break
+                if not started.get('sent'):
+                    await send_start()
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started.get('sent'):
+                await send_start()
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+    async def _send_file(self, wrapper, headers, send, disconnected):
+        remaining = next((int(v) for k, v in headers if k.lower() == 'content-length'), None)
+        while not disconnected.done() and (remaining is None or remaining > 0):
+            size = wrapper.block_size if remaining is None else min(wrapper.block_size, remaining)
+            chunk = await asyncio.to_thread(wrapper.f.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def _plain(self, send, status, message):
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'text/plain; charset=utf-8'),
+            (b'content-length', str(len(message)).encode()),
+            (b'connection', b'close'),
+        ]})
+        await send({'type': 'http.response.body', 'body': message})
+
+
+def serve(app, host='0.0.0.0', port=8080, threads=16, max_request_body_size=0, sockets=None, upload_tracker=None):
+    # Drop-in for waitress.serve(app, host=..., port=..., threads=...)
+    try:
+        import uvicorn
+        from uvicorn.protocols.http.h11_impl import H11Protocol
+    except ImportError:
+        raise RuntimeError('ASGI mode needs uvicorn (pip install uvicorn)') from None
+
+    bridge = WSGIBridge(app, threads=threads, max_body=max_request_body_size, tracker=upload_tracker)
+    config = uvicorn.Config(bridge, host=host, port=port, http=H11Protocol, lifespan='off',
+                            log_config=None, access_log=False, backlog=2048, timeout_keep_alive=15)
+    print(f"Serving on http://{host}:{port} (asyncio, {threads} worker threads)")
+    asyncio.run(uvicorn.Server(config).serve(sockets=sockets))
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import socket
+import random
+import hashlib
+import argparse
+import platform
+import subprocess
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+# Load test for a class submission burst. Starts app.py under Waitress on
+# localhost with a throwaway config, then simulates N students:
+#
+#   upload    - every student uploads mixed-size files, most named "baitap.docx"
+#   stampede  - every student downloads the same assignment file at once
+#   admin     - the teacher page is reloaded against a folder of many files
+#
+# Reports throughput, p50/p95/p99 latency, peak server RSS and correctness
+# (no lost or overwritten submissions) as JSON, so runs can be compared
+# between versions:
+#
+#   python benchmark.py --students 60 --out bench.json
+#   python benchmark.py --scenarios admin --admin-files 10000
+#   python benchmark.py --server-mode asgi
+
+BOUNDARY = 'benchmarkboundary7MA4YWxkTrZu0gW'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentiles(durations):
+    if not durations:
+        return {}
+    ordered = sorted(durations)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99), 'max_ms': round(ordered[-1] * 1000, 2)}
+
+
+def peak_rss(pid):
+    # Peak resident set size of the server process in MB, None if unavailable
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def multipart(filename, data):
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n').encode()
+    return head + data + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+class Client:
+    # One keep-alive connection per simulated student
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+        self.cookie = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+            try:
+                started = time.perf_counter()
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                elapsed = time.perf_counter() - started
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, data, elapsed
+
+
+def run_clients(students, work):
+    # work(student_index) -> list of (ok, elapsed, bytes); returns merged results and wall time
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        results = [r for chunk in pool.map(work, range(students)) for r in chunk]
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall):
+    durations = [elapsed for ok, elapsed, _ in results]
+    transferred = sum(size for _, _, size in results)
+    summary = {
+        'requests': len(results),
+        'errors': sum(1 for ok, _, _ in results if not ok),
+        'wall_s': round(wall, 3),
+        'req_per_s': round(len(results) / wall, 1) if wall else None,
+        'mb_per_s': round(transferred / wall / (1024 * 1024), 2) if wall else None,
+    }
+    summary.update(percentiles(durations))
+    return summary
+
+
+def scenario_upload(args, port, upload_folder):
+    rng = random.Random(args.seed)
+    sizes = [10 * 1024, 200 * 1024, 1024 * 1024, 5 * 1024 * 1024]
+    plan = []
+    for student in range(args.students):
+        files = []
+        for n in range(args.uploads_per_student):
+            # Mostly the same name, so duplicate naming is exercised under contention
+            name = 'baitap.docx' if rng.random() < 0.8 else f'hs{student:03d}_{n}.docx'
+            data = os.urandom(rng.choice(sizes))
+            files.append((name, data))
+        plan.append(files)
+    sent_hashes = [hashlib.sha256(data).hexdigest() for files in plan for _, data in files]
+
+    def work(student):
+        client = Client(port)
+        results = []
+        for name, data in plan[student]:
+            body = multipart(name, data)
+            status, _, elapsed = client.request('POST', '/upload', body=body, headers={
+                'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+            })
+            results.append((status in (200, 302), elapsed, len(body)))
+        return results
+
+    results, wall = run_clients(args.students, work)
+    summary = summarize(results, wall)
+
+    stored = {}
+    for entry in os.scandir(upload_folder):
+        if entry.is_file() and not entry.name.startswith('.'):
+            with open(entry.path, 'rb') as f:
+                stored[hashlib.sha256(f.read()).hexdigest()] = entry.name
+    lost = [h for h in sent_hashes if h not in stored]
+    summary['correctness'] = {
+        'sent': len(sent_hashes),
+        'stored_files': len(stored),
+        'lost_or_overwritten': len(lost),
+        'ok': not lost and len(stored) == len(set(sent_hashes)),
+    }
+    return summary
+
+
+def scenario_stampede(args, port, assignment_folder):
+    data = os.urandom(args.assignment_mb * 1024 * 1024)
+    with open(os.path.join(assignment_folder, 'de_thi.pdf'), 'wb') as f:
+        f.write(data)
+    expected = hashlib.sha256(data).hexdigest()
+    barrier = threading.Barrier(args.students)
+
+    def work(student):
+        client = Client(port)
+        barrier.wait()
+        status, body, elapsed = client.request('GET', '/download_assignment/de_thi.pdf')
+        ok = status == 200 and hashlib.sha256(body).hexdigest() == expected
+        return [(ok, elapsed, len(body))]
+
+    summary = summarize(*run_clients(args.students, work))
+    summary['file_mb'] = args.assignment_mb
+    return summary
+
+
+def scenario_admin(args, port, upload_folder, admin_user, admin_pass):
+    existing = sum(1 for _ in os.scandir(upload_folder))
+    for i in range(existing, args.admin_files):
+        with open(os.path.join(upload_folder, f'bai_{i:05d}.docx'), 'wb') as f:
+            f.write(b'x' * (i % 4096))
+
+    login = f'username={admin_user}&password={admin_pass}'.encode()
+    views = ['/', '/?sort=time&order=desc', '/?sort=size', '/?page=5']
+
+    def work(student):
+        client = Client(port)
+        client.request('POST', '/login', body=login, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        results = []
+        for n in range(args.admin_reloads):
+            status, body, elapsed = client.request('GET', views[n % len(views)])
+            results.append((status == 200, elapsed, len(body)))
+        return results
+
+    summary = summarize(*run_clients(min(args.students, args.admin_clients), work))
+    summary['folder_files'] = args.admin_files
+    return summary
+
+
+def serve(config_path):
+    # Child process: run the app exactly like the launcher does
+    os.environ['WEBDAV_MANAGER_CONFIG'] = config_path
+    from app import app, get_threads, get_server_mode
+    from settings import current_config
+    if get_server_mode() == 'asgi':
+        from asgi import serve as server_serve
+    else:
+        from waitress import serve as server_serve
+    server_serve(app, host='127.0.0.1', port=current_config()['port'], threads=get_threads())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Class submission burst benchmark')
+    parser.add_argument('--students', type=int, default=60)
+    parser.add_argument('--scenarios', default='upload,stampede,admin')
+    parser.add_argument('--uploads-per-student', type=int, default=3)
+    parser.add_argument('--assignment-mb', type=int, default=20)
+    parser.add_argument('--admin-files', type=int, default=10000)
+    parser.add_argument('--admin-clients', type=int, default=5)
+    parser.add_argument('--admin-reloads', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--server-mode', choices=('waitress', 'asgi'), default='waitress')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='bench_output.json')
+    parser.add_argument('--serve', metavar='CONFIG', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='webdav-bench-')
+    upload_folder = os.path.join(work_dir, 'data')
+    assignment_folder = os.path.join(work_dir, 'baitap')
+    os.makedirs(upload_folder)
+    os.makedirs(assignment_folder)
+    port = free_port()
+    bench_config = {
+        'host': '127.0.0.1',
+        'port': port,
+        'upload_folder': upload_folder,
+        'assignment_folder': assignment_folder,
+        'debug': False,
+        'admin_user': 'admin',
+        'admin_pass': 'bench',
+        'secret_key': 'bench',
+        'max_upload_mb': 0,
+        'ledger_file': os.path.join(work_dir, 'submissions.db'),
+        'threads': args.threads,
+        'server_mode': args.server_mode,
+    }
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump(bench_config, f, indent=4)
+
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', config_path],
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise SystemExit('Server did not start')
+                time.sleep(0.1)
+
+        report = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': {k: v for k, v in vars(args).items() if k != 'serve'},
+            'scenarios': {},
+        }
+        for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+            print(f'Running {name}...')
+            if name == 'upload':
+                result = scenario_upload(args, port, upload_folder)
+            elif name == 'stampede':
+                result = scenario_stampede(args, port, assignment_folder)
+            elif name == 'admin':
+                result = scenario_admin(args, port, upload_folder, 'admin', 'bench')
+            else:
+                raise SystemExit(f'Unknown scenario: {name}')
+            result['server_peak_rss_mb'] = peak_rss(server.pid)
+            report['scenarios'][name] = result
+            print(json.dumps(result, indent=2))
+
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Saved {args.out}')
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import os
+import secrets
+import threading
+
+# Content index for deduplicating submissions: sha256 -> stored name of the
+# first copy in each folder. Seeded from the ledger the first time a folder is
+# used, then kept current by the upload and delete paths.
+
+
+class ContentIndex:
+    def __init__(self, seed):
+        # seed(folder) -> {sha256: stored_name}
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._folders = {}
+
+    def _state(self, folder):
+        # caller holds the lock
+        state = self._folders.get(folder)
+        if state is None:
+            by_hash = dict(self._seed(folder))
+            by_name = {name: sha256 for sha256, name in by_hash.items()}
+            state = self._folders[folder] = (by_hash, by_name)
+        return state
+
+    def find(self, folder, sha256):
+        with self._lock:
+            return self._state(folder)[0].get(sha256)
+
+    def add(self, folder, sha256, name):
+        with self._lock:
+            by_hash, by_name = self._state(folder)
+            by_hash.setdefault(sha256, name)
+            if by_hash[sha256] == name:
+                by_name[name] = sha256
+
+    def remove(self, folder, name):
+        with self._lock:
+            state = self._folders.get(folder)
+            if state is None:
+                return
+            by_hash, by_name = state
+            sha256 = by_name.pop(name, None)
+            if sha256 is not None and by_hash.get(sha256) == name:
+                del by_hash[sha256]
+
+    def invalidate(self, folder=None):
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(folder, None)
+
+
+def link_into(existing_path, target_path):
+    # Atomically make target_path a hard link to existing_path (replacing the
+    # placeholder there). Returns False where hard links are not supported,
+    # e.g. FAT32/exFAT USB sticks.
+    temp_path = os.path.join(os.path.dirname(target_path), f'.link-{secrets.token_hex(8)}')
+    try:
+        os.link(existing_path, temp_path)
+    except OSError:
+        return False
+    try:
+        os.replace(temp_path, target_path)
+    except OSError:
+        os.remove(temp_path)
+        return False
+    return True
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# Bounded LRU cache of whole file bodies, used for assignment files that a whole
+# class downloads at the same moment. Entries are keyed by path and validated
+# against the file's (mtime, size), so an edited file is reloaded on the next
+# request. Concurrent misses for the same file wait for a single read.
+
+CachedFile = namedtuple('CachedFile', 'data etag mtime size')
+
+
+class FileCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._total = 0
+
+    def cacheable(self, size):
+        # A single file may use at most half the budget
+        return 0 < size <= self.max_bytes // 2
+
+    def _lookup(self, path, st):
+        # caller holds the lock
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        if entry.mtime != st.st_mtime_ns or entry.size != st.st_size:
+            self._drop(path)
+            return None
+        self._entries.move_to_end(path)
+        return entry
+
+    def _drop(self, path):
+        # caller holds the lock
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._total -= entry.size
+
+    def get(self, path, st):
+        # Returns a CachedFile for path (stat result st), reading it if needed,
+        # or None if the file is too large to cache.
+        if not self.cacheable(st.st_size):
+            return None
+        while True:
+            with self._lock:
+                entry = self._lookup(path, st)
+                if entry is not None:
+                    return entry
+                event = self._loading.get(path)
+                if event is None:
+                    event = self._loading[path] = threading.Event()
+                    break
+            # Someone else is reading this file: wait for it, then look again
+            event.wait()
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            entry = CachedFile(data, hashlib.sha256(data).hexdigest()[:32], st.st_mtime_ns, len(data))
+            with self._lock:
+                if len(data) == st.st_size:
+                    self._drop(path)
+                    self._entries[path] = entry
+                    self._total += entry.size
+                    while self._total > self.max_bytes and self._entries:
+                        self._drop(next(iter(self._entries)))
+            return entry
+        finally:
+            with self._lock:
+                self._loading.pop(path, None)
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
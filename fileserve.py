@@ -0,0 +1,90 @@
+import os
+import mimetypes
+from datetime import datetime, timezone
+from werkzeug.http import http_date, is_resource_modified, parse_range_header
+from werkzeug.wrappers import Response
+
+# File responses with full HTTP caching and byte-range support:
+# ETag / Last-Modified validators, If-None-Match / If-Modified-Since -> 304,
+# Range -> 206 (honouring If-Range) and Accept-Ranges.
+# The body is handed to the server's wsgi.file_wrapper, positioned at the
+# range start with Content-Length as the limit, so Waitress streams it from
+# its own output buffer instead of iterating chunks through the application.
+
+BLOCK_SIZE = 256 * 1024
+LENGTH_AWARE_SERVERS = ('waitress', 'webdav-manager-asgi')
+
+
+def _iter_file(f, length):
+    # Fallback body when the server offers no wsgi.file_wrapper
+    try:
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def etag_for(size, mtime_ns):
+    return f"{size:x}-{mtime_ns:x}"
+
+
+def file_etag(st):
+    return etag_for(st.st_size, st.st_mtime_ns)
+
+
+def serve_file(environ, path, st=None, mimetype=None):
+    if st is None:
+        st = os.stat(path)
+    size = st.st_size
+    etag = file_etag(st)
+    mtime = datetime.fromtimestamp(int(st.st_mtime), tz=timezone.utc)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    headers = {
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'no-cache',
+    }
+
+    if not is_resource_modified(environ, etag=etag, last_modified=mtime):
+        return Response(status=304, headers=headers)
+
+    start, length, status = 0, size, 200
+    if 'HTTP_RANGE' in environ and (
+        'HTTP_IF_RANGE' not in environ
+        or not is_resource_modified(environ, etag=etag, last_modified=mtime, ignore_if_range=False)
+    ):
+        byte_range = parse_range_header(environ['HTTP_RANGE'])
+        bounds = byte_range.range_for_length(size) if byte_range else None
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        length = stop - start
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    headers['Content-Length'] = str(length)
+    if environ['REQUEST_METHOD'] == 'HEAD':
+        return Response(status=status, headers=headers, mimetype=mimetype)
+
+    f = open(path, 'rb')
+    if start:
+        f.seek(start)
+    file_wrapper = environ.get('wsgi.file_wrapper')
+    # Waitress and the asyncio bridge stop their file wrapper at Content-Length;
+    # other servers may read to EOF, so only give them the wrapper when the
+    # range runs to the end.
+    if file_wrapper is not None and (
+        length == size - start or environ.get('SERVER_SOFTWARE', '').startswith(LENGTH_AWARE_SERVERS)
+    ):
+        body = file_wrapper(f, BLOCK_SIZE)
+    else:
+        body = _iter_file(f, length)
+    return Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
@@ -1,34 +1,119 @@
+import startup
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
-import json
 import threading
 import sys
 import os
-import webbrowser
 import logging
-import requests
 import multiprocessing
 import queue
 import socket
-from waitress import serve
-from app import app, reload_config, CONFIG_FILE
+import time
+import random
+from settings import SERVER_MODES, current_config, load_config, save_config
+from metrics import percentile, merge_snapshots, BUCKETS
+
+# The web stack (Flask, Werkzeug, Waitress/uvicorn) is imported only inside
+# run_server, i.e. in the server processes; the GUI process never loads it.
+startup.mark('imports')
+
+# Helper class to redirect stdout/stderr to a multiprocessing Queue.
+# Writes are buffered and shipped as one message per LOG_BATCH_BYTES or
+# LOG_BATCH_INTERVAL seconds, instead of one pickle + pipe write per fragment.
+LOG_BATCH_BYTES = 16 * 1024
+LOG_BATCH_INTERVAL = 0.2
 
-# Helper class to redirect stdout/stderr to a multiprocessing Queue
 class QueueWriter:
-    def __init__(self, q):
+    def __init__(self, q, prefix=''):
         self.queue = q
+        self.prefix = prefix  # e.g. "[w1] ", put in front of every line
+        self._line_start = True
+        self._lock = threading.Lock()
+        self._parts = []
+        self._size = 0
+        flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        flusher.start()
 
     def write(self, msg):
-        if msg:
-            self.queue.put(msg)
+        if not msg:
+            return
+        with self._lock:
+            if self.prefix:
+                msg = self._prefixed(msg)
+            self._parts.append(msg)
+            self._size += len(msg)
+            if self._size < LOG_BATCH_BYTES:
+                return
+            batch = self._take()
+        self.queue.put(batch)
+
+    def _prefixed(self, msg):
+        # caller holds the lock
+        lines = msg.split('\n')
+        for i, line in enumerate(lines):
+            if line and (i or self._line_start):
+                lines[i] = self.prefix + line
+        self._line_start = msg.endswith('\n')
+        return '\n'.join(lines)
+
+    def _take(self):
+        # caller holds the lock
+        batch = ''.join(self._parts)
+        self._parts = []
+        self._size = 0
+        return batch
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(LOG_BATCH_INTERVAL)
+            self.flush()
 
     def flush(self):
-        pass
+        with self._lock:
+            if not self._parts:
+                return
+            batch = self._take()
+        self.queue.put(batch)
+
+class SampleFilter(logging.Filter):
+    # Keeps every WARNING and above, and roughly `rate` of everything below
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+def setup_child_logging(config):
+    level = getattr(logging, str(config.get('log_level', 'INFO')).upper(), logging.INFO)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s', '%H:%M:%S'))
+    handler.addFilter(SampleFilter(float(config.get('log_sample_rate', 1.0))))
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [handler]
+    root_logger.setLevel(level)
+
+# How often the server child sends a metrics snapshot to the GUI (seconds)
+METRICS_INTERVAL = 1.0
+
+def open_listener(host, port):
+    # The GUI process owns the listening socket; every worker serves the same one
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    return socket.create_server((host, port), family=family, backlog=1024)
+
+def push_metrics(metrics, status_queue, mirror=None):
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        status_queue.put(('metrics', metrics.snapshot()))
+        if mirror is not None:
+            try:
+                status_queue.put(('mirror', mirror.status()))
+            except Exception as e:
+                status_queue.put(('mirror', {'enabled': True, 'pending': None, 'lag': 0, 'error': str(e)}))
 
-def run_waitress_server(host, port, log_queue):
+def run_server(host, port, log_queue, status_queue, worker_id=0, sock=None, generation=None, workers=1):
     # Redirect stdout/stderr to queue in this child process
-    sys.stdout = QueueWriter(log_queue)
-    sys.stderr = QueueWriter(log_queue)
+    sys.stdout = sys.stderr = QueueWriter(log_queue, prefix=f"[w{worker_id}] " if workers > 1 else '')
     
     # We need to ensure app loads correct config in this process
     # But since config.json is saved before this process starts, app.py will read it on import/run.
@@ -36,40 +121,71 @@ def run_waitress_server(host, port, log_queue):
     # On Windows, multiprocessing spawns fresh, so app is imported fresh.
     # config.json acts as the source of truth.
     
-    print(f"Initializing Waitress Server on {host}:{port}...")
     try:
-        from app import app
+        startup.mark('launcher module')
+        import flask  # imported on its own only to time it separately from app init
+        startup.mark('flask + werkzeug')
+        from app import app, get_max_upload_bytes, get_threads, get_server_mode, attach_worker, metrics, mirror, upload_tracker
+        startup.mark('app init')
+        mode = get_server_mode()
+        print(f"Initializing {'ASGI (uvicorn)' if mode == 'asgi' else 'Waitress'} Server on {host}:{port}...")
+        setup_child_logging(current_config())
+        if generation is not None:
+            attach_worker(worker_id, generation)
+        # Only worker 0 runs the mirror copier, so only it reports replication lag
+        threading.Thread(target=push_metrics, args=(metrics, status_queue, mirror if worker_id == 0 else None),
+                         daemon=True).start()
         # Ensure 'app' uses the secret key from config if needed, though secure_filename/sessions might need it.
         # app module init code runs on import.
-        
-        serve(app, host=host, port=port, threads=16)
+
+        options = {}
+        limit = get_max_upload_bytes()
+        if limit:
+            # Let the server refuse oversized bodies before buffering them (1 MB slack for multipart headers)
+            options['max_request_body_size'] = limit + 1024 * 1024
+
+        if mode == 'asgi':
+            from asgi import serve
+        else:
+            from waitress import serve
+        startup.mark('server import')
+        startup.report(f"w{worker_id}")
+
+        if mode == 'asgi':
+            serve(app, host=host, port=port, threads=get_threads(), sockets=[sock] if sock else None,
+                  upload_tracker=upload_tracker, **options)
+        elif sock is not None:
+            serve(app, sockets=[sock], threads=get_threads(), **options)
+        else:
+            serve(app, host=host, port=port, threads=get_threads(), **options)
     except Exception as e:
         print(f"Server Error: {e}")
 
 class RedirectText:
-    def __init__(self, text_ctrl, root):
-        self.output = text_ctrl
-        self.root = root
+    # stdout/stderr of the GUI process; poll_log_queue writes it out with the server log
+    def __init__(self, pending):
+        self.pending = pending
 
     def write(self, string):
-        # Schedule the update on the main thread to avoid GUI freezing/crashing
-        self.root.after(0, self._safe_write, string)
-
-    def _safe_write(self, string):
-        try:
-            self.output.insert(tk.END, string)
-            self.output.see(tk.END)
-        except:
-            pass # Ignore errors if window is closed
+        if string:
+            self.pending.put(string)
 
     def flush(self):
         pass
 
+# Max queued messages inserted per GUI tick; the rest wait for the next tick
+LOG_DRAIN_LIMIT = 500
+
+# A worker that dies sooner than this after starting counts as a crash loop;
+# after WORKER_MAX_QUICK_EXITS of those the server is stopped instead of restarted
+WORKER_MIN_UPTIME = 10.0
+WORKER_MAX_QUICK_EXITS = 3
+
 class AppGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("📚 Teacher WebDAV Manager")
-        self.root.geometry("700x750")
+        self.root.geometry("760x980")
         self.root.resizable(True, True)
         
         # Configure style
@@ -92,44 +208,142 @@ class AppGUI:
         # Load Config
         self.config = {}
         self.load_config_file()
+        startup.mark('config')
 
         # UI Elements
         self.create_widgets()
         
         # Redirect stdout/stderr for MAIN process (GUI logic logs)
-        sys.stdout = RedirectText(self.log_area, self.root)
-        sys.stderr = RedirectText(self.log_area, self.root)
-
-        self.server_process = None
+        self.local_log = queue.Queue()
+        sys.stdout = RedirectText(self.local_log)
+        sys.stderr = RedirectText(self.local_log)
+
+        self.server_processes = []  # index = worker id
+        self.worker_started = []
+        self.quick_exits = 0
+        self.listener = None
+        self.generation = None  # listing-change counters shared by the workers
         self.log_queue = multiprocessing.Queue()
+        self.status_queue = multiprocessing.Queue()
+        self.worker_metrics = {}
+        self.last_metrics = None
         self.poll_log_queue()
 
-    def poll_log_queue(self):
+    def _drain(self, q, parts, limit):
         try:
-            while True:
-                msg = self.log_queue.get_nowait()
-                self.log_area.insert(tk.END, msg)
-                self.log_area.see(tk.END)
+            while len(parts) < limit:
+                parts.append(q.get_nowait())
         except queue.Empty:
             pass
+
+    def poll_log_queue(self):
+        # Collect everything that arrived since the last tick and insert it at once
+        parts = []
+        self._drain(self.local_log, parts, LOG_DRAIN_LIMIT)
+        self._drain(self.log_queue, parts, LOG_DRAIN_LIMIT)
+        if parts:
+            try:
+                self.log_area.insert(tk.END, ''.join(parts))
+                self._trim_log()
+                self.log_area.see(tk.END)
+            except tk.TclError:
+                pass # Ignore errors if window is closed
+        self.poll_status_queue()
+        self.supervise_workers()
         # Poll every 100ms
         self.root.after(100, self.poll_log_queue)
 
-    def load_config_file(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r') as f:
-                self.config = json.load(f)
+    def _trim_log(self):
+        # Ring buffer: keep only the last log_max_lines lines in the widget
+        max_lines = int(self.config.get('log_max_lines', 2000))
+        lines = int(self.log_area.index('end-1c').split('.')[0])
+        if lines > max_lines:
+            self.log_area.delete('1.0', f'{lines - max_lines + 1}.0')
+
+    def poll_status_queue(self):
+        updated = False
+        try:
+            while True:
+                kind, payload = self.status_queue.get_nowait()
+                if kind == 'metrics' and self.server_processes:
+                    self.worker_metrics[payload['worker']] = payload
+                    updated = True
+                elif kind == 'mirror' and self.server_processes:
+                    self.show_mirror(payload)
+        except queue.Empty:
+            pass
+        if updated:
+            self.show_metrics(merge_snapshots(self.worker_metrics.values()))
+
+    def show_mirror(self, status):
+        if not status['enabled']:
+            text = ""
+        elif status['error']:
+            text = f"⚠️ Sao lưu đang chờ: {status['error']}"
+            if status['pending']:
+                text += f" (còn {status['pending']} việc)"
+        elif status['pending']:
+            text = f"🪞 Sao lưu: còn {status['pending']} việc, trễ {status['lag']:.0f} s"
+        else:
+            text = "🪞 Sao lưu: đã đồng bộ"
+        if status['enabled'] and status['parked']:
+            text += f" — ⚠️ {status['parked']} file không sao lưu được ({status['parked_error']})"
+        self.mirror_var.set(text)
+
+    def server_running(self):
+        return any(process.is_alive() for process in self.server_processes)
+
+    def spawn_worker(self, worker_id):
+        workers = len(self.server_processes)
+        process = multiprocessing.Process(
+            target=run_server,
+            args=(self.config.get('host', '0.0.0.0'), self.config.get('port', 8080), self.log_queue,
+                  self.status_queue, worker_id, self.listener, self.generation, workers),
+            daemon=True
+        )
+        process.start()
+        self.server_processes[worker_id] = process
+        self.worker_started[worker_id] = time.monotonic()
+
+    def supervise_workers(self):
+        # Restart worker processes that died while the server is running
+        for worker_id, process in enumerate(self.server_processes):
+            if process.is_alive():
+                continue
+            print(f"GUI: Worker {worker_id} exited (code {process.exitcode}).")
+            if time.monotonic() - self.worker_started[worker_id] < WORKER_MIN_UPTIME:
+                self.quick_exits += 1
+                if self.quick_exits >= WORKER_MAX_QUICK_EXITS:
+                    print("GUI: Workers keep exiting right after start, stopping the server. See the log above.")
+                    self.stop_server()
+                    return
+            self.worker_metrics.pop(worker_id, None)
+            print(f"GUI: Restarting worker {worker_id}...")
+            self.spawn_worker(worker_id)
+
+    def show_metrics(self, snapshot):
+        # Rates and p95 over the interval since the previous snapshot
+        previous, self.last_metrics = self.last_metrics, snapshot
+        if previous is None or snapshot['time'] <= previous['time']:
+            return
+        elapsed = snapshot['time'] - previous['time']
+        req_rate = max(0, snapshot['requests'] - previous['requests']) / elapsed
+        in_rate = max(0, snapshot['bytes_in'] - previous['bytes_in']) / elapsed / (1024 * 1024)
+        buckets = [max(0, a - b) for a, b in zip(snapshot['buckets'], previous['buckets'])]
+        p95 = percentile(buckets, 0.95)
+        if p95 is None:
+            p95_text = '–'
+        elif p95 == float('inf'):
+            p95_text = f'> {BUCKETS[-1]:.0f} s'
         else:
-            self.config = {
-                "host": "0.0.0.0",
-                "port": 8080,
-                "upload_folder": "data",
-                "assignment_folder": "",
-                "debug": True,
-                "admin_user": "admin",
-                "admin_pass": "123456",
-                "secret_key": "changeme"
-            }
+            p95_text = f'≤ {p95 * 1000:.0f} ms'
+        self.stats_var.set(
+            f"📈 {req_rate:.1f} req/s   ⏱ p95 {p95_text}   ⬆️ Đang tải lên: {snapshot['uploads']}"
+            f"   🔄 Đang xử lý: {snapshot['in_flight']}   📥 {in_rate:.2f} MB/s"
+        )
+
+    def load_config_file(self):
+        self.config = load_config()
 
     def save_config_file(self):
         self.config['host'] = self.host_var.get()
@@ -138,16 +352,26 @@ class AppGUI:
         except ValueError:
             messagebox.showerror("Error", "Port must be a number")
             return False
+
+        try:
+            self.config['threads'] = int(self.threads_var.get())
+            self.config['upload_slots'] = int(self.upload_slots_var.get())
+            self.config['workers'] = max(1, int(self.workers_var.get()))
+        except ValueError:
+            messagebox.showerror("Error", "Threads, upload slots and workers must be numbers")
+            return False
+        if self.config['threads'] < 1 or not 1 <= self.config['upload_slots'] <= self.config['threads']:
+            messagebox.showerror("Error", "Upload slots must be between 1 and the number of threads")
+            return False
         
+        self.config['server_mode'] = self.server_mode_var.get()
         self.config['admin_user'] = self.user_var.get()
         self.config['admin_pass'] = self.pass_var.get()
         self.config['upload_folder'] = self.folder_var.get()
         self.config['assignment_folder'] = self.assignment_var.get()
+        self.config['mirror_folder'] = self.mirror_folder_var.get()
 
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(self.config, f, indent=4)
-        
-        reload_config()
+        save_config(self.config)
         return True
 
     def get_lan_ip(self):
@@ -189,6 +413,33 @@ class AppGUI:
         port_entry.grid(row=1, column=1, sticky="ew", pady=8, padx=(10, 0))
         ttk.Label(settings_frame, text="(default: 8080)", font=('Segoe UI', 9), foreground='#7f8c8d').grid(row=1, column=2, sticky="w", padx=10)
 
+        # Worker threads / upload budget
+        ttk.Label(settings_frame, text="Threads:").grid(row=2, column=0, sticky="w", pady=8)
+        self.threads_var = tk.StringVar(value=str(self.config.get('threads', 16)))
+        threads_entry = ttk.Entry(settings_frame, textvariable=self.threads_var, width=30)
+        threads_entry.grid(row=2, column=1, sticky="ew", pady=8, padx=(10, 0))
+        ttk.Label(settings_frame, text="(default: 16)", font=('Segoe UI', 9), foreground='#7f8c8d').grid(row=2, column=2, sticky="w", padx=10)
+
+        ttk.Label(settings_frame, text="Upload slots:").grid(row=3, column=0, sticky="w", pady=8)
+        self.upload_slots_var = tk.StringVar(value=str(self.config.get('upload_slots', 12)))
+        upload_slots_entry = ttk.Entry(settings_frame, textvariable=self.upload_slots_var, width=30)
+        upload_slots_entry.grid(row=3, column=1, sticky="ew", pady=8, padx=(10, 0))
+        ttk.Label(settings_frame, text="(max concurrent uploads)", font=('Segoe UI', 9), foreground='#7f8c8d').grid(row=3, column=2, sticky="w", padx=10)
+
+        # Worker processes
+        ttk.Label(settings_frame, text="Workers:").grid(row=5, column=0, sticky="w", pady=8)
+        self.workers_var = tk.StringVar(value=str(self.config.get('workers', 1)))
+        workers_entry = ttk.Entry(settings_frame, textvariable=self.workers_var, width=30)
+        workers_entry.grid(row=5, column=1, sticky="ew", pady=8, padx=(10, 0))
+        ttk.Label(settings_frame, text="(processes sharing the port, default: 1)", font=('Segoe UI', 9), foreground='#7f8c8d').grid(row=5, column=2, sticky="w", padx=10)
+
+        # Server engine
+        ttk.Label(settings_frame, text="Server mode:").grid(row=4, column=0, sticky="w", pady=8)
+        self.server_mode_var = tk.StringVar(value=self.config.get('server_mode', 'waitress'))
+        mode_combo = ttk.Combobox(settings_frame, textvariable=self.server_mode_var, values=SERVER_MODES, state="readonly", width=28)
+        mode_combo.grid(row=4, column=1, sticky="ew", pady=8, padx=(10, 0))
+        ttk.Label(settings_frame, text="(asgi = many slow clients, needs uvicorn)", font=('Segoe UI', 9), foreground='#7f8c8d').grid(row=4, column=2, sticky="w", padx=10)
+
         # Authentication Frame
         auth_frame = ttk.LabelFrame(main_frame, text="🔐 Admin Authentication", padding=15)
         auth_frame.pack(fill="x", padx=0, pady=(0, 10))
@@ -225,6 +476,13 @@ class AppGUI:
         ttk.Button(storage_frame, text="Browse", command=self.choose_assignment_folder, width=10).grid(row=1, column=2, padx=5)
         ttk.Button(storage_frame, text="📂 Open", command=self.open_assignment_folder, width=10).grid(row=1, column=3, padx=2)
 
+        # Mirror Folder (second copy of every submission, e.g. on the internal disk)
+        ttk.Label(storage_frame, text="Mirror Folder:").grid(row=2, column=0, sticky="w", pady=8)
+        self.mirror_folder_var = tk.StringVar(value=self.config.get('mirror_folder', ''))
+        mirror_entry = ttk.Entry(storage_frame, textvariable=self.mirror_folder_var, width=25)
+        mirror_entry.grid(row=2, column=1, sticky="ew", pady=8, padx=(10, 0))
+        ttk.Button(storage_frame, text="Browse", command=self.choose_mirror_folder, width=10).grid(row=2, column=2, padx=5)
+
         storage_frame.columnconfigure(1, weight=1)
         settings_frame.columnconfigure(1, weight=1)
         auth_frame.columnconfigure(1, weight=1)
@@ -245,6 +503,13 @@ class AppGUI:
         self.exit_btn = ttk.Button(btn_frame, text="❌ Exit", command=self.exit_app)
         self.exit_btn.pack(side="left", expand=True, fill="x", padx=2)
 
+        # Live server metrics (updated from the server process every second)
+        self.stats_var = tk.StringVar(value="📈 Server chưa chạy")
+        ttk.Label(main_frame, textvariable=self.stats_var, font=('Segoe UI', 9), foreground='#2c3e50').pack(fill="x", pady=(0, 2))
+        # Replication lag of the mirror folder (empty when mirroring is off)
+        self.mirror_var = tk.StringVar(value="")
+        ttk.Label(main_frame, textvariable=self.mirror_var, font=('Segoe UI', 9), foreground='#2c3e50').pack(fill="x", pady=(0, 8))
+
         # Log Area with better styling
         log_frame = ttk.LabelFrame(main_frame, text="📋 Console Log", padding=10)
         log_frame.pack(fill="both", expand=True, padx=0, pady=(0, 0))
@@ -270,6 +535,11 @@ class AppGUI:
         if folder_selected:
             self.assignment_var.set(folder_selected)
 
+    def choose_mirror_folder(self):
+        folder_selected = filedialog.askdirectory()
+        if folder_selected:
+            self.mirror_folder_var.set(folder_selected)
+
     def open_folder(self):
         folder = self.folder_var.get()
         # If relative path, make it absolute based on CWD or executable loc
@@ -313,7 +583,7 @@ class AppGUI:
                 messagebox.showerror("Error", f"Folder does not exist and cannot act: {e}")
 
     def start_server(self):
-        if self.server_process and self.server_process.is_alive():
+        if self.server_running():
             messagebox.showinfo("Info", "Server is already running.")
             return
 
@@ -321,25 +591,35 @@ class AppGUI:
             print("Config saved. Starting server...")
             host = self.config.get('host', '0.0.0.0')
             port = self.config.get('port', 8080)
-            
-            # Use multiprocessing Process instead of Thread
-            self.server_process = multiprocessing.Process(
-                target=run_waitress_server, 
-                args=(host, port, self.log_queue),
-                daemon=True
-            )
-            self.server_process.start()
+            workers = max(1, int(self.config.get('workers', 1)))
+
+            try:
+                self.listener = open_listener(host, port)
+            except OSError as e:
+                messagebox.showerror("Error", f"Cannot listen on {host}:{port}: {e}")
+                return
+
+            # One multiprocessing Process per worker, all accepting on the same socket
+            self.generation = multiprocessing.Array('q', 64)  # per-folder listing change counters
+            self.server_processes = [None] * workers
+            self.worker_started = [0.0] * workers
+            self.quick_exits = 0
+            for worker_id in range(workers):
+                self.spawn_worker(worker_id)
             
             self.start_btn.config(state="disabled")
             self.stop_btn.config(state="normal")
             self.browser_btn.config(state="normal")
             
             # Print info (from main process)
-            print(f"GUI: Server process started on http://{host}:{port}")
+            print(f"GUI: Server started on http://{host}:{port} ({workers} worker process{'es' if workers > 1 else ''})")
             print(f"GUI: Folder bài nộp: {self.config.get('upload_folder')}")
             assignment_folder = self.config.get('assignment_folder', '')
             if assignment_folder:
                 print(f"GUI: Folder đề bài: {assignment_folder}")
+            mirror_folder = self.config.get('mirror_folder', '')
+            if mirror_folder:
+                print(f"GUI: Folder sao lưu: {mirror_folder}")
 
             # Show helpful IP info
             lan_ip = self.get_lan_ip()
@@ -349,22 +629,32 @@ class AppGUI:
             print(f"--------------------------------------------------")
 
     def stop_server(self):
-        if not self.server_process or not self.server_process.is_alive():
+        if not self.server_processes:
             return
             
         self.stop_btn.config(text="Stopping...", state="disabled")
         
-        # Terminate the process
+        # Terminate the worker processes
         try:
-            self.server_process.terminate()
-            self.server_process.join(timeout=2)
-            if self.server_process.is_alive():
-                 self.server_process.kill()
+            for process in self.server_processes:
+                process.terminate()
+            for process in self.server_processes:
+                process.join(timeout=2)
+                if process.is_alive():
+                     process.kill()
             print("GUI: Server process terminated.")
         except Exception as e:
             print(f"GUI: Error stopping server: {e}")
             
-        self.server_process = None
+        self.server_processes = []
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        self.generation = None
+        self.worker_metrics = {}
+        self.last_metrics = None
+        self.stats_var.set("📈 Server chưa chạy")
+        self.mirror_var.set("")
         
         self.start_btn.config(state="normal")
         self.stop_btn.config(text="Stop Server", state="disabled")
@@ -380,10 +670,11 @@ class AppGUI:
         
     def open_browser(self):
         port = self.config.get('port', 8080)
+        import webbrowser
         webbrowser.open(f"http://localhost:{port}")
 
     def exit_app(self):
-        if self.server_process and self.server_process.is_alive():
+        if self.server_processes:
             self.stop_server()
         self.root.destroy()
         sys.exit(0)
@@ -393,6 +684,9 @@ if __name__ == "__main__":
     try:
         root = tk.Tk()
         app_gui = AppGUI(root)
+        startup.mark('window')
+        if startup.ENABLED:
+            root.after_idle(lambda: (startup.mark('first paint'), startup.report('gui')))
         root.mainloop()
     except Exception as e:
         # Fallback if GUI fails
@@ -0,0 +1,190 @@
+import os
+import time
+import secrets
+import sqlite3
+import threading
+import queue
+
+# Background jobs for the admin's bulk operations (delete / move / archive of
+# many submissions at once).
+#
+# A job is a list of items plus a step(item) callable and an optional
+# finish(done, failed, error) called once at the end, so per-job cleanup such
+# as refreshing the listing cache happens once and not per file. error is the
+# exception that stopped the job early (anything but an OSError from step,
+# which only counts the item as failed), or None. Jobs run one at
+# a time on a thread of the process that accepted them; their progress is
+# written to a small SQLite table (WAL) so any worker process can answer the
+# browser's progress polls. A job remembers the pid of the process running
+# it; if that process has died (a crashed or restarted worker), the job is
+# marked failed when the next JobQueue starts up or when its status is asked
+# for, instead of staying "running" forever. Its items are gone with the
+# process, so it cannot be requeued.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    state TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    owner INTEGER
+);
+"""
+
+# Columns added after the first release: (name, definition)
+MIGRATIONS = (
+    ('owner', 'INTEGER'),
+)
+
+PROGRESS_INTERVAL = 0.25  # seconds between progress writes
+KEEP_SECONDS = 24 * 3600  # finished jobs older than this are dropped
+ORPHAN_MESSAGE = 'server đã dừng trước khi tác vụ xong'
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+            with self._schema_lock:
+                if not self._schema_ready:
+                    existing = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+                    if existing:
+                        for name, definition in MIGRATIONS:
+                            if name not in existing:
+                                try:
+                                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} {definition}')
+                                except sqlite3.OperationalError:
+                                    pass  # another worker process migrated first
+                    conn.executescript(SCHEMA)
+                    conn.commit()
+                    self._schema_ready = True
+                    self._fail_orphans(conn)
+        return conn
+
+    def _fail_orphans(self, conn, job_id=None):
+        # Mark unfinished jobs (all, or just job_id) whose owner process is gone as failed
+        query = 'SELECT id, owner FROM jobs WHERE state IN (?, ?)'
+        args = ('queued', 'running')
+        if job_id is not None:
+            query += ' AND id = ?'
+            args += (job_id,)
+        orphans = [row['id'] for row in conn.execute(query, args)
+                   if row['owner'] is None or (row['owner'] != os.getpid() and not _process_alive(row['owner']))]
+        for orphan in orphans:
+            conn.execute('UPDATE jobs SET state = ?, message = ? WHERE id = ? AND state IN (?, ?)',
+                         ('error', ORPHAN_MESSAGE, orphan, 'queued', 'running'))
+        if orphans:
+            conn.commit()
+
+    def submit(self, kind, items, step, finish=None):
+        # Queue a job; returns its id for status()
+        items = list(items)
+        job_id = secrets.token_hex(8)
+        conn = self._conn()
+        conn.execute('DELETE FROM jobs WHERE created_at < ? AND state IN (?, ?)',
+                     (time.time() - KEEP_SECONDS, 'done', 'error'))
+        conn.execute('INSERT INTO jobs (id, kind, created_at, state, total, owner) VALUES (?, ?, ?, ?, ?, ?)',
+                     (job_id, kind, time.time(), 'queued', len(items), os.getpid()))
+        conn.commit()
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='jobs', daemon=True)
+                self._thread.start()
+        self._queue.put((job_id, items, step, finish))
+        return job_id
+
+    def status(self, job_id):
+        # {'id', 'kind', 'state', 'total', 'done', 'failed', 'message'} or None
+        conn = self._conn()
+        self._fail_orphans(conn, job_id)
+        row = conn.execute(
+            'SELECT id, kind, state, total, done, failed, message FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def _update(self, job_id, **fields):
+        conn = self._conn()
+        conn.execute(f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                     (*fields.values(), job_id))
+        conn.commit()
+
+    def _run(self):
+        while True:
+            job_id, items, step, finish = self._queue.get()
+            try:
+                self._execute(job_id, items, step, finish)
+            except Exception as e:
+                # A step or finish() raised something unexpected; the job is over either way
+                print(f"Job {job_id} failed: {e}")
+                self._update(job_id, state='error', message=str(e))
+
+    def _execute(self, job_id, items, step, finish):
+        self._update(job_id, state='running')
+        done = failed = 0
+        message = None
+        last_write = time.monotonic()
+        try:
+            for item in items:
+                try:
+                    step(item)
+                    done += 1
+                except OSError as e:
+                    failed += 1
+                    message = f'{item}: {e.strerror or e}'
+                if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+                    self._update(job_id, done=done, failed=failed)
+                    last_write = time.monotonic()
+        except Exception as e:
+            # Still let the job clean up (temp files, reserved names, caches)
+            if finish:
+                try:
+                    finish(done, failed, e)
+                except Exception as cleanup_error:
+                    print(f"Job {job_id} cleanup failed: {cleanup_error}")
+            raise
+        result = finish(done, failed, None) if finish else None
+        self._update(job_id, state='done', done=done, failed=failed, message=result or message)
@@ -0,0 +1,223 @@
+import queue
+import sqlite3
+import threading
+import time
+
+# Submission ledger: one row per received file, kept in an SQLite database
+# (WAL mode) next to config.json. Request threads only put rows on a queue; a
+# background thread writes them in batches so the ledger adds no latency to
+# uploads. Reads use a per-thread connection and never block the writer.
+# When a stored file is deleted or overwritten its rows get removed_at, so the
+# dedup index is never seeded with a name that no longer holds that content.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    original_name TEXT NOT NULL,
+    stored_name TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    client_ip TEXT,
+    duplicate_of TEXT,
+    removed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_created ON submissions (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_submissions_ip ON submissions (client_ip, created_at);
+CREATE INDEX IF NOT EXISTS idx_submissions_sha256 ON submissions (sha256);
+CREATE INDEX IF NOT EXISTS idx_submissions_stored ON submissions (folder, stored_name);
+"""
+
+COLUMNS = ('created_at', 'original_name', 'stored_name', 'folder', 'size', 'sha256', 'client_ip', 'duplicate_of')
+
+# Columns added after the first release: (name, definition)
+MIGRATIONS = (
+    ('duplicate_of', 'TEXT'),
+    ('removed_at', 'REAL'),
+)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class Ledger:
+    def __init__(self, path, batch_size=200, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._writer = None
+
+    def _ensure_started(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is not None:
+                return
+            conn = _connect(self.path)
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(submissions)')}
+            if existing:
+                for name, definition in MIGRATIONS:
+                    if name not in existing:
+                        try:
+                            conn.execute(f'ALTER TABLE submissions ADD COLUMN {name} {definition}')
+                        except sqlite3.OperationalError:
+                            pass  # another worker process migrated first
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._writer = threading.Thread(target=self._write_loop, args=(conn,), name='ledger-writer', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self, conn):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            items = [item for item in batch if item is not None]
+            if items:
+                try:
+                    with conn:
+                        self._apply(conn, items)
+                except sqlite3.Error as e:
+                    print(f"Ledger write failed ({len(items)} rows): {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _apply(self, conn, items):
+        # New rows (dicts) and forget() marks (tuples), in the order they were queued
+        rows = []
+        for item in items + [()]:
+            if isinstance(item, dict):
+                rows.append(item)
+                continue
+            if rows:
+                conn.executemany(
+                    f"INSERT INTO submissions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [tuple(row.get(c) for c in COLUMNS) for row in rows],
+                )
+                rows = []
+            if item:
+                conn.execute('UPDATE submissions SET removed_at = ? '
+                             'WHERE folder = ? AND stored_name = ? AND removed_at IS NULL', item)
+
+    def record(self, **row):
+        row.setdefault('created_at', time.time())
+        self._ensure_started()
+        self._queue.put(row)
+
+    def forget(self, folder, stored_name):
+        # The file stored under this name was deleted or replaced
+        self._ensure_started()
+        self._queue.put((time.time(), folder, stored_name))
+
+    def flush(self):
+        # Block until everything recorded so far is written
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self._ensure_started()
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def search(self, name=None, client_ip=None, since=None, until=None, cursor=None, limit=50):
+        # Newest first, keyset-paginated on (created_at, id).
+        # Returns (rows, next_cursor); pass next_cursor back to get the following page.
+        where, params = [], []
+        if name:
+            where.append("(original_name LIKE ? ESCAPE '\\' OR stored_name LIKE ? ESCAPE '\\')")
+            pattern = '%' + name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params += [pattern, pattern]
+        if client_ip:
+            where.append('client_ip = ?')
+            params.append(client_ip)
+        if since is not None:
+            where.append('created_at >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('created_at < ?')
+            params.append(until)
+        if cursor:
+            where.append('(created_at, id) < (?, ?)')
+            params += list(cursor)
+
+        sql = 'SELECT * FROM submissions'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+    def known_hashes(self, folder):
+        # sha256 -> stored name of the first copy received in folder that is still there
+        rows = self._reader().execute(
+            'SELECT sha256, stored_name FROM submissions '
+            'WHERE folder = ? AND sha256 IS NOT NULL AND duplicate_of IS NULL AND removed_at IS NULL ORDER BY id',
+            (folder,),
+        )
+        hashes = {}
+        for row in rows:
+            hashes.setdefault(row['sha256'], row['stored_name'])
+        return hashes
+
+    def duplicate_groups(self, folder, limit=200):
+        # Contents received more than once, most repeated first
+        return self._reader().execute(
+            'SELECT sha256, COUNT(*) AS copies, MAX(size) AS size, MIN(created_at) AS first_at, '
+            'GROUP_CONCAT(stored_name, char(10)) AS names, GROUP_CONCAT(DISTINCT client_ip) AS client_ips '
+            'FROM submissions WHERE folder = ? AND sha256 IS NOT NULL '
+            'GROUP BY sha256 HAVING COUNT(*) > 1 ORDER BY copies DESC, first_at LIMIT ?',
+            (folder, limit),
+        ).fetchall()
+
+    def duplicate_copies(self, folder):
+        # stored name -> its latest row, for names whose latest (not removed) row
+        # repeats content received earlier under another name
+        rows = self._reader().execute(
+            'SELECT s.stored_name, s.size, s.sha256, s.duplicate_of FROM submissions s '
+            'JOIN (SELECT MAX(id) AS id FROM submissions WHERE folder = ? GROUP BY stored_name) latest '
+            'ON s.id = latest.id '
+            'WHERE s.removed_at IS NULL AND s.duplicate_of IS NOT NULL AND s.stored_name != s.duplicate_of',
+            (folder,),
+        )
+        return {row['stored_name']: row for row in rows}
+
+    def find_receipt(self, receipt, limit=20):
+        # Rows whose content hash starts with the receipt code shown to the student
+        return self._reader().execute(
+            'SELECT * FROM submissions WHERE sha256 >= ? AND sha256 < ? ORDER BY id DESC LIMIT ?',
+            (receipt, receipt + 'g', limit),
+        ).fetchall()
@@ -0,0 +1,177 @@
+import os
+import stat
+import time
+import zlib
+import threading
+from collections import namedtuple
+
+# Cached directory listings for the admin page and /baitap.
+# A folder is scanned once with os.scandir; our own upload/delete paths update
+# the cached entries in place. Changes made outside the server (Explorer, USB
+# copy) are picked up by comparing the folder's mtime on each read, plus a
+# periodic full rescan for filesystems such as FAT32 that do not bump a
+# directory's mtime reliably. With several worker processes, shared change
+# counters (attach) make every worker rescan a folder after any worker changed
+# it. Folders are hashed onto a small array of counters, so an upload burst
+# in one folder does not make the others (say, the assignment folder) stale.
+
+Entry = namedtuple('Entry', 'name size mtime is_dir mtime_ns')
+
+SORT_KEYS = {
+    'name': lambda e: e.name.lower(),
+    'time': lambda e: e.mtime,
+    'size': lambda e: e.size,
+}
+
+
+class _FolderState:
+    __slots__ = ('entries', 'dir_mtime', 'scanned_at', 'generation', 'views', 'shared_seen')
+
+    def __init__(self, shared_seen=0):
+        self.entries = {}
+        self.dir_mtime = None
+        self.scanned_at = 0
+        self.generation = 0
+        self.views = {}
+        self.shared_seen = shared_seen
+
+
+class ListingCache:
+    def __init__(self, hide=None, max_age=30, on_rescan=None):
+        self.hide = hide
+        self.max_age = max_age
+        self.on_rescan = on_rescan
+        self._lock = threading.Lock()
+        self._folders = {}
+        self._generation = 0
+        self._shared = None
+
+    def attach(self, shared):
+        # shared: multiprocessing.Array('q') of listing-change counters, shared by the workers
+        with self._lock:
+            self._shared = shared
+            self._folders.clear()
+
+    def _slot(self, folder):
+        return zlib.crc32(os.path.normcase(folder).encode('utf-8', 'surrogateescape')) % len(self._shared)
+
+    def _shared_value(self, folder):
+        # caller holds the lock
+        return self._shared[self._slot(folder)] if self._shared is not None else 0
+
+    def _check_shared(self, folder, state):
+        # caller holds the lock; another worker changed this folder (or one sharing
+        # its counter) -> rescan it now
+        value = self._shared_value(folder)
+        if value != state.shared_seen:
+            state.shared_seen = value
+            state.dir_mtime = None
+
+    def _publish(self, folder=None):
+        # caller holds the lock; tell the other workers about our own change (None: every folder)
+        if self._shared is None:
+            return
+        slots = range(len(self._shared)) if folder is None else (self._slot(folder),)
+        with self._shared.get_lock():
+            for slot in slots:
+                self._shared[slot] += 1
+            state = self._folders.get(folder) if folder is not None else None
+            if state is not None and state.shared_seen == self._shared[slots[0]] - 1:
+                # Only our own change since we last looked: no need to rescan
+                state.shared_seen += 1
+
+    def _entry(self, name, st, is_dir):
+        return Entry(name, 0 if is_dir else st.st_size, st.st_mtime, is_dir, st.st_mtime_ns)
+
+    def _scan(self, folder, state, dir_mtime):
+        entries = {}
+        with os.scandir(folder) as it:
+            for dent in it:
+                if self.hide and self.hide(dent.name):
+                    continue
+                try:
+                    is_dir = dent.is_dir()
+                    entries[dent.name] = self._entry(dent.name, dent.stat(), is_dir)
+                except OSError:
+                    continue
+        first = state.scanned_at == 0
+        state.dir_mtime = dir_mtime
+        state.scanned_at = time.monotonic()
+        if entries == state.entries and not first:
+            # Nothing changed (periodic rescan, or another worker's change elsewhere):
+            # keep the generation, so pages and lookups built on it stay valid
+            return
+        state.entries = entries
+        self._changed(state)
+        if self.on_rescan:
+            self.on_rescan(folder)
+
+    def _changed(self, state):
+        # caller holds the lock
+        self._generation += 1
+        state.generation = self._generation
+        state.views = {}
+
+    def _fresh_state(self, folder):
+        # caller holds the lock
+        dir_mtime = os.stat(folder).st_mtime_ns
+        state = self._folders.get(folder)
+        if state is None:
+            state = self._folders[folder] = _FolderState(self._shared_value(folder))
+        self._check_shared(folder, state)
+        if state.dir_mtime != dir_mtime or time.monotonic() - state.scanned_at > self.max_age:
+            self._scan(folder, state, dir_mtime)
+        return state
+
+    def generation(self, folder):
+        with self._lock:
+            return self._fresh_state(folder).generation
+
+    def entries(self, folder, sort='name', reverse=False):
+        # Sorted list of Entry; shared between callers, do not mutate
+        key = SORT_KEYS.get(sort, SORT_KEYS['name'])
+        with self._lock:
+            state = self._fresh_state(folder)
+            view = state.views.get((sort, reverse))
+            if view is None:
+                view = state.views[(sort, reverse)] = sorted(state.entries.values(), key=key, reverse=reverse)
+            return view
+
+    def add(self, folder, name):
+        try:
+            st = os.stat(os.path.join(folder, name))
+        except OSError:
+            return
+        with self._lock:
+            self._publish(folder)
+            state = self._folders.get(folder)
+            if state is None:
+                return
+            state.entries[name] = self._entry(name, st, stat.S_ISDIR(st.st_mode))
+            self._changed(state)
+            self._sync_mtime(folder, state)
+
+    def remove(self, folder, name):
+        with self._lock:
+            self._publish(folder)
+            state = self._folders.get(folder)
+            if state is None:
+                return
+            state.entries.pop(name, None)
+            self._changed(state)
+            self._sync_mtime(folder, state)
+
+    def _sync_mtime(self, folder, state):
+        # Our own change moved the folder's mtime; remember it so it does not force a rescan
+        try:
+            state.dir_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            state.dir_mtime = None
+
+    def invalidate(self, folder=None):
+        with self._lock:
+            self._publish(folder)
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(folder, None)
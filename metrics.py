@@ -0,0 +1,245 @@
+import time
+import bisect
+import threading
+
+# Request metrics collected by a WSGI middleware: per-route request counts,
+# latency histograms and bytes in/out, plus in-flight and active-upload gauges.
+# Each worker thread updates its own counters without locking; readers sum
+# over all threads, which is exact enough for monitoring.
+
+ENDPOINT_KEY = 'app.endpoint'
+
+# Upper bounds in seconds; the last bucket is +Inf
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _RouteStats:
+    __slots__ = ('requests', 'buckets', 'latency_sum', 'bytes_in', 'bytes_out')
+
+    def __init__(self):
+        self.requests = {}  # status class ("2xx", ...) -> count
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class _ThreadStats:
+    __slots__ = ('routes', 'in_flight', 'uploads')
+
+    def __init__(self):
+        self.routes = {}
+        self.in_flight = 0
+        self.uploads = 0
+
+
+class _ResponseIter:
+    # Counts bytes sent and records the request when the server closes the response
+    def __init__(self, app_iter, finish):
+        self._app_iter = app_iter
+        self._finish = finish
+        self.sent = 0
+
+    def __iter__(self):
+        for chunk in self._app_iter:
+            self.sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._app_iter, 'close'):
+                self._app_iter.close()
+        finally:
+            self._finish(self.sent)
+
+
+class Metrics:
+    def __init__(self, app):
+        self.app = app
+        self.worker = 0  # worker process id when several workers share the port
+        self.started = time.time()
+        self._local = threading.local()
+        self._threads = []
+        self._threads_lock = threading.Lock()
+
+    def _stats(self):
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            stats = self._local.stats = _ThreadStats()
+            with self._threads_lock:
+                self._threads.append(stats)
+        return stats
+
+    def _record(self, route, status, latency, bytes_in, bytes_out):
+        route_stats = self._stats().routes.get(route)
+        if route_stats is None:
+            route_stats = self._stats().routes[route] = _RouteStats()
+        status_class = f'{status[:1]}xx'
+        route_stats.requests[status_class] = route_stats.requests.get(status_class, 0) + 1
+        route_stats.buckets[bisect.bisect_left(BUCKETS, latency)] += 1
+        route_stats.latency_sum += latency
+        route_stats.bytes_in += bytes_in
+        route_stats.bytes_out += bytes_out
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        try:
+            bytes_in = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            bytes_in = 0
+        is_upload = bytes_in > 0 and environ.get('REQUEST_METHOD') in ('POST', 'PUT', 'PATCH')
+
+        stats = self._stats()
+        stats.in_flight += 1
+        if is_upload:
+            stats.uploads += 1
+
+        response = {}
+
+        def _start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            return start_response(status, headers, exc_info)
+
+        def finish(bytes_out):
+            done = self._stats()
+            done.in_flight -= 1
+            if is_upload:
+                done.uploads -= 1
+            self._record(environ.get(ENDPOINT_KEY, 'other'), response.get('status', '500'),
+                         time.perf_counter() - started, bytes_in, bytes_out)
+
+        try:
+            app_iter = self.app(environ, _start_response)
+        except Exception:
+            finish(0)
+            raise
+
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(app_iter, file_wrapper):
+            # Wrapping would hide the file from the server's fast path; count
+            # Content-Length and stop the clock once the body is handed over
+            length = 0
+            for name, value in response.get('headers', ()):
+                if name.lower() == 'content-length':
+                    length = int(value)
+            finish(length)
+            return app_iter
+        return _ResponseIter(app_iter, finish)
+
+    # --- reading -----------------------------------------------------------
+
+    def _totals(self):
+        with self._threads_lock:
+            threads = list(self._threads)
+        routes = {}
+        in_flight = uploads = 0
+        for stats in threads:
+            in_flight += stats.in_flight
+            uploads += stats.uploads
+            for route, rs in list(stats.routes.items()):
+                total = routes.setdefault(route, _RouteStats())
+                for status_class, count in list(rs.requests.items()):
+                    total.requests[status_class] = total.requests.get(status_class, 0) + count
+                for i, count in enumerate(rs.buckets):
+                    total.buckets[i] += count
+                total.latency_sum += rs.latency_sum
+                total.bytes_in += rs.bytes_in
+                total.bytes_out += rs.bytes_out
+        return routes, in_flight, uploads
+
+    def snapshot(self):
+        # Compact all-routes summary, cheap to pickle to the GUI
+        routes, in_flight, uploads = self._totals()
+        buckets = [0] * (len(BUCKETS) + 1)
+        requests = bytes_in = bytes_out = 0
+        for rs in routes.values():
+            requests += sum(rs.requests.values())
+            bytes_in += rs.bytes_in
+            bytes_out += rs.bytes_out
+            for i, count in enumerate(rs.buckets):
+                buckets[i] += count
+        return {
+            'time': time.time(),
+            'worker': self.worker,
+            'requests': requests,
+            'buckets': buckets,
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'in_flight': in_flight,
+            'uploads': uploads,
+        }
+
+    def render_prometheus(self):
+        routes, in_flight, uploads = self._totals()
+        lines = [
+            '# HELP webdav_requests_total Requests handled, by route and status class.',
+            '# TYPE webdav_requests_total counter',
+        ]
+        for route, rs in sorted(routes.items()):
+            for status_class, count in sorted(rs.requests.items()):
+                lines.append(f'webdav_requests_total{{route="{route}",status="{status_class}"}} {count}')
+
+        lines += [
+            '# HELP webdav_request_duration_seconds Request latency until the response is closed.',
+            '# TYPE webdav_request_duration_seconds histogram',
+        ]
+        for route, rs in sorted(routes.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), rs.buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'webdav_request_duration_seconds_bucket{{route="{route}",le="{le}"}} {cumulative}')
+            lines.append(f'webdav_request_duration_seconds_sum{{route="{route}"}} {rs.latency_sum:.6f}')
+            lines.append(f'webdav_request_duration_seconds_count{{route="{route}"}} {cumulative}')
+
+        for name, attr, help_text in (
+            ('webdav_received_bytes_total', 'bytes_in', 'Request body bytes received.'),
+            ('webdav_sent_bytes_total', 'bytes_out', 'Response body bytes sent.'),
+        ):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for route, rs in sorted(routes.items()):
+                lines.append(f'{name}{{route="{route}"}} {getattr(rs, attr)}')
+
+        lines += [
+            '# HELP webdav_requests_in_flight Requests currently being handled.',
+            '# TYPE webdav_requests_in_flight gauge',
+            f'webdav_requests_in_flight {in_flight}',
+            '# HELP webdav_uploads_in_flight Requests with a body (uploads) currently being handled.',
+            '# TYPE webdav_uploads_in_flight gauge',
+            f'webdav_uploads_in_flight {uploads}',
+            '# HELP webdav_start_time_seconds Process start time.',
+            '# TYPE webdav_start_time_seconds gauge',
+            f'webdav_start_time_seconds {self.started:.0f}',
+            '# HELP webdav_worker Worker process that answered this scrape (each worker counts its own requests).',
+            '# TYPE webdav_worker gauge',
+            f'webdav_worker {self.worker}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def percentile(buckets, q):
+    # Upper bound (seconds) of the bucket holding the q-th quantile, None if empty
+    total = sum(buckets)
+    if not total:
+        return None
+    target = q * total
+    cumulative = 0
+    for bound, count in zip(BUCKETS + (float('inf'),), buckets):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return float('inf')
+
+
+def merge_snapshots(snapshots):
+    # One snapshot summed over the latest snapshot of each worker process
+    snapshots = list(snapshots)
+    merged = {
+        'time': max(s['time'] for s in snapshots),
+        'worker': None,
+        'buckets': [sum(counts) for counts in zip(*(s['buckets'] for s in snapshots))],
+    }
+    for key in ('requests', 'bytes_in', 'bytes_out', 'in_flight', 'uploads'):
+        merged[key] = sum(s[key] for s in snapshots)
+    return merged
@@ -0,0 +1,232 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import secrets
+import threading
+
+# Background mirroring of the submission folder to a second folder
+# (mirror_folder in config.json), so pulling the USB stick that holds
+# upload_folder does not lose the class's work.
+#
+# Request threads only append a job ("copy" or "delete" of a path relative to
+# the upload folder) to a persistent SQLite queue, so uploads never wait for
+# the second write and pending jobs survive a restart. One copier thread (in
+# worker 0) applies the jobs in order: files are copied in large blocks to a
+# temp name, read back and compared by SHA-256, then renamed into place. While
+# either folder is missing (USB unplugged) the copier just waits; a job that
+# fails with both folders in place (file too big for FAT32, unreadable source,
+# disk full) is retried MAX_ATTEMPTS times, then parked so it stops blocking
+# the queue. Parked jobs show up in status() and get another round after a
+# restart or when the same path is queued again.
+
+BLOCK_SIZE = 1024 * 1024
+TEMP_PREFIX = '.mirror-'
+MAX_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    action TEXT NOT NULL,
+    path TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_path ON jobs (path, id);
+"""
+
+# Columns added after the first release; existing queues get them on open
+MIGRATIONS = (
+    ('parked_at', 'REAL'),
+    ('error', 'TEXT'),
+)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _sha256_of(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(BLOCK_SIZE)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+
+def copy_verified(source, target):
+    # Copy source to target through a temp file; raises OSError if the copy does not read back identical
+    folder = os.path.dirname(target)
+    os.makedirs(folder, exist_ok=True)
+    temp_path = os.path.join(folder, TEMP_PREFIX + secrets.token_hex(8) + '.part')
+    h = hashlib.sha256()
+    try:
+        with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+            st = os.fstat(src.fileno())
+            while True:
+                chunk = src.read(BLOCK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                h.update(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if _sha256_of(temp_path) != h.hexdigest():
+            raise OSError(f'checksum mismatch copying {source}')
+        os.utime(temp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class Mirror:
+    def __init__(self, queue_path, get_source, get_target, poll_interval=2.0, retry_delay=10.0):
+        # get_source() / get_target() -> absolute folders; an empty target disables mirroring
+        self.queue_path = queue_path
+        self.get_source = get_source
+        self.get_target = get_target
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.last_error = None
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._thread = None
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.queue_path)
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    existing = {r[1] for r in conn.execute('PRAGMA table_info(jobs)')}
+                    for name, definition in MIGRATIONS:
+                        if name not in existing:
+                            try:
+                                conn.execute(f'ALTER TABLE jobs ADD COLUMN {name} {definition}')
+                            except sqlite3.OperationalError:
+                                pass  # another worker process migrated first
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def enqueue(self, action, path):
+        # action: "copy" or "delete"; path: absolute path inside the upload folder
+        if not self.get_target():
+            return
+        try:
+            rel = os.path.relpath(path, self.get_source())
+        except ValueError:  # another drive
+            return
+        if rel.startswith(os.pardir):
+            return
+        conn = self._conn()
+        conn.execute('INSERT INTO jobs (created_at, action, path) VALUES (?, ?, ?)',
+                     (time.time(), action, rel.replace(os.sep, '/')))
+        conn.commit()
+        self._wake.set()
+
+    def start(self):
+        # Run the copier in this process (only one process should)
+        if self._thread is None:
+            conn = self._conn()
+            conn.execute('UPDATE jobs SET parked_at = NULL, attempts = 0 WHERE parked_at IS NOT NULL')
+            conn.commit()
+            self._thread = threading.Thread(target=self._run, name='mirror', daemon=True)
+            self._thread.start()
+
+    def status(self):
+        # {'enabled', 'pending', 'lag' (seconds since the oldest pending job), 'error',
+        #  'parked' (jobs given up on), 'parked_error' (path and error of the latest one)}
+        if not self.get_target():
+            return {'enabled': False, 'pending': 0, 'lag': 0, 'error': None, 'parked': 0, 'parked_error': None}
+        conn = self._conn()
+        count, oldest = conn.execute('SELECT COUNT(*), MIN(created_at) FROM jobs '
+                                     'WHERE parked_at IS NULL').fetchone()
+        parked = conn.execute('SELECT COUNT(*) FROM jobs WHERE parked_at IS NOT NULL').fetchone()[0]
+        latest = conn.execute('SELECT path, error FROM jobs WHERE parked_at IS NOT NULL '
+                              'ORDER BY parked_at DESC LIMIT 1').fetchone()
+        return {
+            'enabled': True,
+            'pending': count,
+            'lag': time.time() - oldest if oldest else 0,
+            'error': self.last_error,
+            'parked': parked,
+            'parked_error': f'{latest[0]}: {latest[1]}' if latest else None,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                done = self._step()
+            except (OSError, sqlite3.Error) as e:
+                self.last_error = str(e)
+                time.sleep(self.retry_delay)
+                continue
+            if not done:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _step(self):
+        # Apply the oldest job; returns False when there was nothing to do
+        target_root = self.get_target()
+        if not target_root:
+            return False
+        conn = self._conn()
+        row = conn.execute('SELECT id, action, path, attempts FROM jobs WHERE parked_at IS NULL '
+                           'ORDER BY id LIMIT 1').fetchone()
+        if row is None:
+            self.last_error = None
+            return False
+        job_id, action, rel, attempts = row
+        source_root = self.get_source()
+        if not os.path.isdir(source_root):
+            raise OSError(f'upload folder unavailable: {source_root}')
+        try:
+            os.makedirs(target_root, exist_ok=True)
+        except OSError as e:
+            raise OSError(f'mirror folder unavailable: {target_root}') from e
+        # A later job for the same path supersedes this one
+        newer = conn.execute('SELECT 1 FROM jobs WHERE path = ? AND id > ? LIMIT 1', (rel, job_id)).fetchone()
+        if newer is None:
+            conn.execute('UPDATE jobs SET attempts = attempts + 1 WHERE id = ?', (job_id,))
+            conn.commit()
+            try:
+                self._apply(action, os.path.join(source_root, rel), os.path.join(target_root, rel))
+            except OSError as e:
+                if attempts + 1 < MAX_ATTEMPTS:
+                    raise
+                # Both folders are there, so this job is not going to work; let the rest through
+                conn.execute('UPDATE jobs SET parked_at = ?, error = ? WHERE id = ?', (time.time(), str(e), job_id))
+                conn.commit()
+                self.last_error = None
+                return True
+        # Parked jobs for the same path are superseded too
+        conn.execute('DELETE FROM jobs WHERE path = ? AND id <= ?', (rel, job_id))
+        conn.commit()
+        self.last_error = None
+        return True
+
+    def _apply(self, action, source, target):
+        if action == 'delete':
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+            elif os.path.exists(target):
+                os.remove(target)
+        elif os.path.isdir(source):
+            os.makedirs(target, exist_ok=True)
+        elif os.path.isfile(source):
+            copy_verified(source, target)
+        # else: removed again before we got to it; the delete job follows
@@ -0,0 +1,72 @@
+import os
+import threading
+
+# Hands out free submission names ("bai.docx", "bai_01.docx", ...) without
+# probing the disk for every candidate. Each folder is scanned once, then kept
+# up to date by our own upload/delete paths. The final reservation is an
+# exclusive create, so files added behind our back are still never overwritten.
+
+
+class NameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._folders = {}
+
+    def _state(self, folder):
+        # (taken names, next suffix per (stem, ext)); caller holds the lock
+        state = self._folders.get(folder)
+        if state is None:
+            names = set()
+            with os.scandir(folder) as it:
+                for entry in it:
+                    names.add(os.path.normcase(entry.name))
+            state = self._folders[folder] = (names, {})
+        return state
+
+    def _allocate(self, folder, filename):
+        with self._lock:
+            names, counters = self._state(folder)
+            key = os.path.normcase(filename)
+            if key not in names:
+                names.add(key)
+                return filename
+
+            name, ext = os.path.splitext(filename)
+            base = (os.path.normcase(name), os.path.normcase(ext))
+            counter = counters.get(base, 1)
+            while True:
+                candidate = f"{name}_{counter:02d}{ext}"
+                counter += 1
+                if os.path.normcase(candidate) not in names:
+                    break
+            counters[base] = counter
+            names.add(os.path.normcase(candidate))
+            return candidate
+
+    def reserve(self, folder, filename):
+        # Returns a name whose (empty) file now exists in folder and belongs to the caller
+        if not filename:
+            raise ValueError('empty file name')
+        while True:
+            candidate = self._allocate(folder, filename)
+            try:
+                fd = os.open(os.path.join(folder, candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                # Created outside the server since the folder was scanned; the
+                # name is already marked as taken, so just try the next one.
+                continue
+            os.close(fd)
+            return candidate
+
+    def release(self, folder, filename):
+        with self._lock:
+            state = self._folders.get(folder)
+            if state is not None:
+                state[0].discard(os.path.normcase(filename))
+
+    def invalidate(self, folder=None):
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(folder, None)
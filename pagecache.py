@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import threading
+from collections import namedtuple
+
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+# Rendered student pages (upload form, assignment list), kept pre-compressed.
+# Each page name holds one entry for its current key (e.g. the assignment
+# folder's listing generation); a new key replaces it. Every entry stores the
+# identity, gzip and (if the brotli package is installed) br bodies, so a
+# repeat load costs neither a Jinja render nor a compression pass, and
+# If-None-Match is answered with 304.
+
+CachedPage = namedtuple('CachedPage', 'key etag bodies')
+
+
+def _encode(html):
+    body = html.encode('utf-8')
+    bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=11)
+    return bodies
+
+
+class PageCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def get(self, name, key, render):
+        # render() -> html string; called only when name has no entry for key
+        with self._lock:
+            page = self._pages.get(name)
+        if page is not None and page.key == key:
+            return page
+        bodies = _encode(render())
+        page = CachedPage(key, hashlib.sha256(bodies['identity']).hexdigest()[:32], bodies)
+        with self._lock:
+            self._pages[name] = page
+        return page
+
+    def invalidate(self):
+        with self._lock:
+            self._pages.clear()
+
+    def respond(self, request, page, mimetype='text/html'):
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in page.bodies and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        response = Response(page.bodies[encoding], mimetype=mimetype)
+        if encoding != 'identity':
+            response.content_encoding = encoding
+        # One strong validator per representation
+        response.set_etag(page.etag if encoding == 'identity' else f'{page.etag}-{encoding}')
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
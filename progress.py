@@ -0,0 +1,113 @@
+import time
+import sqlite3
+import threading
+
+# View of the uploads in flight, for the admin page: who is sending what, how
+# far along, how fast and how long it should still take.
+#
+# The page sends every upload through the resumable API, which reports after
+# every PATCH (the whole file, across chunks); in ASGI mode the bridge also
+# reports ordinary request bodies while they are being received. Waitress
+# buffers a body before the app sees it, so a plain form POST to /upload
+# (browsers without JavaScript) only shows up there in ASGI mode.
+#
+# The table lives in a small SQLite database (WAL) next to config.json, so
+# every worker process writes to and reads from the same one; the ASGI
+# bridge, which sees a body in many small pieces, reports it at most twice a
+# second.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    client_ip TEXT,
+    total INTEGER,
+    received INTEGER NOT NULL,
+    started REAL NOT NULL,
+    updated REAL NOT NULL,
+    rate_at REAL NOT NULL,
+    rate_received INTEGER NOT NULL
+);
+"""
+
+RATE_WINDOW = 5.0  # seconds of history the rate is computed over
+IDLE_SECONDS = 60  # entries without news for this long are dropped
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')  # progress only; losing it in a crash is harmless
+    return conn
+
+
+class UploadTracker:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def begin(self, key, name, client_ip, total, received=0):
+        now = time.time()
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO uploads (key, name, client_ip, total, received, started, updated, '
+                     'rate_at, rate_received) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     (key, name, client_ip, total, received, now, now, now, received))
+        conn.commit()
+
+    def update(self, key, received):
+        # False if key is unknown (never begun, ended or dropped as idle)
+        now = time.time()
+        conn = self._conn()
+        # The rate window restarts at the previous report once it is older than RATE_WINDOW
+        cursor = conn.execute(
+            'UPDATE uploads SET '
+            'rate_at = CASE WHEN ? - rate_at > ? THEN updated ELSE rate_at END, '
+            'rate_received = CASE WHEN ? - rate_at > ? THEN received ELSE rate_received END, '
+            'received = ?, updated = ? WHERE key = ?',
+            (now, RATE_WINDOW, now, RATE_WINDOW, received, now, key))
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def end(self, key):
+        conn = self._conn()
+        conn.execute('DELETE FROM uploads WHERE key = ?', (key,))
+        conn.commit()
+
+    def active(self):
+        # List of dicts, slowest (longest remaining) first
+        now = time.time()
+        conn = self._conn()
+        conn.execute('DELETE FROM uploads WHERE updated < ?', (now - IDLE_SECONDS,))
+        conn.commit()
+        rows = []
+        for upload in conn.execute('SELECT * FROM uploads'):
+            # Stalled clients decay towards 0 rather than keeping their last rate
+            elapsed = now - upload['rate_at']
+            rate = (upload['received'] - upload['rate_received']) / elapsed if elapsed > 0 else 0
+            remaining = max(0, upload['total'] - upload['received']) if upload['total'] else None
+            rows.append({
+                'name': upload['name'],
+                'client_ip': upload['client_ip'],
+                'received': upload['received'],
+                'total': upload['total'],
+                'rate': rate,
+                'eta': remaining / rate if rate > 0 and remaining is not None else None,
+                'elapsed': now - upload['started'],
+                'idle': now - upload['updated'],
+            })
+        rows.sort(key=lambda r: (r['eta'] is not None, -(r['eta'] or 0)))
+        return rows
@@ -0,0 +1,202 @@
+import os
+import re
+import hashlib
+import json
+import time
+import secrets
+import threading
+
+# Resumable (tus-style) upload storage.
+# Each upload keeps two files under <upload_folder>/.partial:
+#   <id>.part  - the bytes received so far (its size is the current offset)
+#   <id>.json  - the original filename, the announced total length and the
+#                folder the finished file goes to
+# plus a short-lived <id>.lock while a chunk is being appended.
+
+PARTIAL_DIR = '.partial'
+CHUNK_SIZE = 64 * 1024
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class OffsetMismatch(Exception):
+    pass
+
+
+class _PartLock:
+    # Cross-process guard for one upload, since several worker processes may
+    # receive its chunks. A lock file older than STALE_SECONDS was left behind
+    # by a crashed worker.
+    STALE_SECONDS = 60
+
+    def __init__(self, path):
+        self.path = path
+
+    def acquire(self):
+        for _ in range(2):
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) < self.STALE_SECONDS:
+                        return False
+                    os.remove(self.path)
+                except OSError:
+                    pass
+        return False
+
+    def release(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class ResumableStore:
+    def __init__(self, expire_seconds=2 * 3600):
+        self.expire_seconds = expire_seconds
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._last_expire = 0
+        # upload_id -> [running SHA-256, bytes hashed] (lost on restart; with several
+        # workers only valid while every chunk reached the same process)
+        self._hashes = {}
+
+    def _folder(self, upload_folder):
+        folder = os.path.join(upload_folder, PARTIAL_DIR)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def _paths(self, upload_folder, upload_id):
+        folder = self._folder(upload_folder)
+        return os.path.join(folder, upload_id + '.part'), os.path.join(folder, upload_id + '.json')
+
+    def _lock(self, upload_id):
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _forget(self, upload_id):
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+            self._hashes.pop(upload_id, None)
+
+    def create(self, upload_folder, filename, length, target=None):
+        # target: folder the upload is stored in once finished (default upload_folder)
+        self.expire(upload_folder)
+        upload_id = secrets.token_hex(16)
+        part_path, meta_path = self._paths(upload_folder, upload_id)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'filename': filename, 'length': length, 'created': time.time(), 'target': target}, f)
+        open(part_path, 'wb').close()
+        self._hashes[upload_id] = [hashlib.sha256(), 0]
+        return upload_id
+
+    def _state(self, upload_folder, upload_id):
+        # (offset, metadata) or None
+        if not _ID_RE.match(upload_id):
+            return None
+        part_path, meta_path = self._paths(upload_folder, upload_id)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            offset = os.path.getsize(part_path)
+        except (OSError, ValueError):
+            return None
+        return offset, meta
+
+    def status(self, upload_folder, upload_id):
+        # Returns (offset, length, filename, target) or None if the upload is unknown/expired
+        state = self._state(upload_folder, upload_id)
+        if state is None:
+            return None
+        offset, meta = state
+        return offset, meta['length'], meta['filename'], meta.get('target') or upload_folder
+
+    def append(self, upload_folder, upload_id, offset, stream):
+        # Append the request body at `offset`; returns the new offset or None if unknown
+        with self._lock(upload_id):
+            if not _ID_RE.match(upload_id):
+                return None
+            part_lock = _PartLock(os.path.join(self._folder(upload_folder), upload_id + '.lock'))
+            locked = part_lock.acquire()
+            try:
+                state = self.status(upload_folder, upload_id)
+                if state is None:
+                    return None
+                current, length, _, _ = state
+                if offset != current or not locked:
+                    # not locked: another worker is writing this upload; the client re-reads the offset
+                    raise OffsetMismatch(current)
+                part_path, _ = self._paths(upload_folder, upload_id)
+                running = self._hashes.get(upload_id)
+                if running is not None and running[1] != current:
+                    # An earlier chunk went to another worker process; hash at finish instead
+                    self._hashes.pop(upload_id, None)
+                    running = None
+                with open(part_path, 'ab') as f:
+                    while current < length:
+                        chunk = stream.read(min(CHUNK_SIZE, length - current))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        if running is not None:
+                            running[0].update(chunk)
+                            running[1] += len(chunk)
+                        current += len(chunk)
+                return current
+            finally:
+                if locked:
+                    part_lock.release()
+
+    def take(self, upload_folder, upload_id):
+        # Hand over a completed upload: returns (part_path, filename, sha256, target) and
+        # forgets the metadata. sha256 is None if the running hash was lost (server restart).
+        # The caller is responsible for moving part_path into target.
+        with self._lock(upload_id):
+            state = self._state(upload_folder, upload_id)
+            if state is None:
+                return None
+            offset, meta = state
+            length, filename = meta['length'], meta['filename']
+            target = meta.get('target') or upload_folder
+            if offset != length:
+                raise OffsetMismatch(offset)
+            part_path, meta_path = self._paths(upload_folder, upload_id)
+            os.remove(meta_path)
+            running = self._hashes.get(upload_id)
+        self._forget(upload_id)
+        if running is None or running[1] != length:
+            return part_path, filename, None, target
+        return part_path, filename, running[0].hexdigest(), target
+
+    def discard(self, upload_folder, upload_id):
+        if not _ID_RE.match(upload_id):
+            return
+        with self._lock(upload_id):
+            for path in self._paths(upload_folder, upload_id):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._forget(upload_id)
+
+    def expire(self, upload_folder):
+        # Drop uploads that have not received data for expire_seconds (checked at most once a minute)
+        now = time.time()
+        if now - self._last_expire < 60:
+            return
+        self._last_expire = now
+        folder = self._folder(upload_folder)
+        with os.scandir(folder) as it:
+            for entry in it:
+                upload_id, ext = os.path.splitext(entry.name)
+                if ext != '.json' or not _ID_RE.match(upload_id):
+                    continue
+                part_path, _ = self._paths(upload_folder, upload_id)
+                try:
+                    last_activity = max(entry.stat().st_mtime, os.path.getmtime(part_path))
+                except OSError:
+                    last_activity = 0
+                if now - last_activity > self.expire_seconds:
+                    self.discard(upload_folder, upload_id)
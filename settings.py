@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import threading
+from types import MappingProxyType
+
+from timetable import Timetable
+
+# Paths and config.json handling shared by the launcher and the web app.
+# Deliberately stdlib-only: the GUI process imports this at startup and must
+# not pay for Flask/Werkzeug/Waitress, which only the server child needs.
+#
+# The server reads its settings from an immutable ConfigSnapshot: values are
+# validated and paths resolved once per version of config.json, and a reload
+# swaps in a new snapshot instead of editing a shared dict, so a request
+# never sees half of an old config and half of a new one. watch_config()
+# reloads when the file's mtime changes.
+
+# Determine if running as a script or frozen exe
+if getattr(sys, 'frozen', False):
+    # Running as compiled exe
+    # Templates are bundled inside the exe (in sys._MEIPASS)
+    TEMPLATE_FOLDER = os.path.join(sys._MEIPASS, 'templates')
+    # Config and data should be relative to the executable file
+    BASE_DIR = os.path.dirname(sys.executable)
+else:
+    # Running as python script
+    TEMPLATE_FOLDER = 'templates'
+    BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Load configuration from file next to the executable/script
+# (WEBDAV_MANAGER_CONFIG points elsewhere, e.g. for benchmark.py)
+CONFIG_FILE = os.environ.get('WEBDAV_MANAGER_CONFIG') or os.path.join(BASE_DIR, 'config.json')
+# The databases shared by the worker processes go next to the config in use,
+# so a second instance with its own config never shares them
+CONFIG_DIR = os.path.dirname(os.path.abspath(CONFIG_FILE))
+
+DEFAULT_CONFIG = {
+    "host": "0.0.0.0",
+    "port": 8080,
+    "upload_folder": "data",
+    "assignment_folder": "",
+    "debug": True,
+    "admin_user": "admin",
+    "admin_pass": "123456",
+    "secret_key": "change_this_secret_key",
+    "max_upload_mb": 500,
+    "upload_fsync": "none",
+    "resumable_expire_minutes": 120,
+    "ledger_file": "submissions.db",
+    "assignment_cache_mb": 256,
+    "dedup": "link",
+    "log_level": "INFO",
+    "log_sample_rate": 1.0,
+    "log_max_lines": 2000,
+    "threads": 16,
+    "upload_slots": 12,
+    "page_slots": 16,
+    "queue_wait_ms": 500,
+    "rate_limit_rps": 20,
+    "rate_limit_burst": 40,
+    "upload_kbps": 0,
+    "server_mode": "waitress",
+    "workers": 1,
+    "mirror_folder": "",
+    "sessions": []
+}
+
+
+SERVER_MODES = ('waitress', 'asgi')
+
+
+def load_config():
+    # Create default config if missing
+    if not os.path.exists(CONFIG_FILE):
+        save_config(DEFAULT_CONFIG)
+    with open(CONFIG_FILE, 'r') as f:
+        return json.load(f)
+
+
+def save_config(config):
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=4)
+
+
+def _number(values, key, default, cast=float, minimum=None):
+    try:
+        value = cast(values.get(key, default))
+    except (TypeError, ValueError):
+        value = cast(default)
+    if minimum is not None and value < minimum:
+        value = cast(minimum)
+    return value
+
+
+def _choice(values, key, choices):
+    # The first choice is the default
+    value = str(values.get(key, choices[0])).lower()
+    return value if value in choices else choices[0]
+
+
+def _folder(name):
+    # Relative folders live next to config.json / the exe
+    return os.path.abspath(os.path.join(BASE_DIR, name)) if name else ''
+
+
+class ConfigSnapshot:
+    # One validated version of config.json. Raw values stay reachable through
+    # get()/[] for settings without a derived attribute.
+    __slots__ = (
+        'values', 'mtime_ns', 'secret_key', 'admin_user', 'admin_pass',
+        'upload_folder', 'upload_realpath', 'assignment_folder', 'assignment_realpath', 'mirror_folder',
+        'max_upload_bytes', 'upload_fsync', 'dedup', 'resumable_expire_seconds', 'ledger_path',
+        'assignment_cache_bytes', 'threads', 'server_mode', 'workers', 'admission', 'timetable',
+    )
+
+    def __init__(self, values, mtime_ns=0):
+        init = super().__setattr__
+        init('values', MappingProxyType(dict(values)))
+        init('mtime_ns', mtime_ns)
+        init('secret_key', str(values.get('secret_key', 'default_secret_key')))
+        init('admin_user', values.get('admin_user', 'admin'))
+        init('admin_pass', values.get('admin_pass', '123456'))
+
+        upload_folder = _folder(values.get('upload_folder') or 'data')
+        init('upload_folder', upload_folder)
+        init('upload_realpath', os.path.realpath(upload_folder))
+        assignment_folder = _folder(values.get('assignment_folder', ''))
+        init('assignment_folder', assignment_folder)
+        init('assignment_realpath', os.path.realpath(assignment_folder) if assignment_folder else '')
+        mirror_folder = _folder(values.get('mirror_folder', ''))
+        if mirror_folder and os.path.normcase(os.path.realpath(mirror_folder)) == os.path.normcase(self.upload_realpath):
+            mirror_folder = ''  # never mirror a folder onto itself
+        init('mirror_folder', mirror_folder)
+        # Submission windows, each with its own subfolder of upload_folder
+        init('timetable', Timetable(values.get('sessions'), upload_folder))
+
+        # 0 / missing means no limit
+        limit_mb = _number(values, 'max_upload_mb', 0)
+        init('max_upload_bytes', int(limit_mb * 1024 * 1024) if limit_mb > 0 else None)
+        init('upload_fsync', _choice(values, 'upload_fsync', ('none', 'file', 'full')))
+        init('dedup', _choice(values, 'dedup', ('link', 'skip', 'off')))
+        init('resumable_expire_seconds', _number(values, 'resumable_expire_minutes', 120, minimum=1) * 60)
+        init('ledger_path', os.path.join(BASE_DIR, values.get('ledger_file') or 'submissions.db'))
+        init('assignment_cache_bytes', int(_number(values, 'assignment_cache_mb', 256, minimum=0) * 1024 * 1024))
+
+        threads = _number(values, 'threads', 16, int, minimum=1)
+        init('threads', threads)
+        init('server_mode', _choice(values, 'server_mode', SERVER_MODES))
+        init('workers', _number(values, 'workers', 1, int, minimum=1))
+        init('admission', MappingProxyType({
+            # Uploads leave at least a few threads free for pages and downloads
+            'upload_slots': min(_number(values, 'upload_slots', max(1, threads - 4), int, minimum=1), threads),
+            'page_slots': _number(values, 'page_slots', threads, int, minimum=1),
+            'queue_wait_ms': _number(values, 'queue_wait_ms', 500, minimum=0),
+            'rate_limit_rps': _number(values, 'rate_limit_rps', 20, minimum=0),
+            'rate_limit_burst': _number(values, 'rate_limit_burst', 40, minimum=0),
+            'upload_kbps': _number(values, 'upload_kbps', 0, minimum=0),
+        }))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ConfigSnapshot is read-only; reload_config() builds a new one')
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+
+_current = None
+_reload_lock = threading.Lock()
+_listeners = []
+
+
+def current_config():
+    # The snapshot in effect; a plain global read, safe from any thread
+    return _current if _current is not None else reload_config()
+
+
+def on_config_change(callback):
+    # callback(snapshot) runs after every reload, in the reloading thread
+    _listeners.append(callback)
+
+
+def reload_config():
+    global _current
+    with _reload_lock:
+        try:
+            mtime_ns = os.stat(CONFIG_FILE).st_mtime_ns
+        except OSError:
+            mtime_ns = 0
+        values = load_config()
+        if not isinstance(values, dict):
+            raise ValueError(f'{CONFIG_FILE} must hold a JSON object')
+        snapshot = ConfigSnapshot(values, mtime_ns)
+        _current = snapshot
+    for callback in _listeners:
+        callback(snapshot)
+    return snapshot
+
+
+def _watch_loop(interval):
+    rejected = None  # mtime of a version that failed to load
+    while True:
+        time.sleep(interval)
+        try:
+            mtime_ns = os.stat(CONFIG_FILE).st_mtime_ns
+        except OSError:
+            continue  # moved away or being replaced; look again later
+        if mtime_ns in (current_config().mtime_ns, rejected):
+            continue
+        try:
+            reload_config()
+            rejected = None
+        except (OSError, ValueError) as e:
+            # Half-written or invalid file: keep the current snapshot until the next change
+            rejected = mtime_ns
+            print(f"Config reload skipped: {e}", file=sys.stderr)
+
+
+_watcher = None
+
+
+def watch_config(interval=2.0):
+    # Reload whenever config.json changes on disk (started once per process)
+    global _watcher
+    if _watcher is None:
+        _watcher = threading.Thread(target=_watch_loop, args=(interval,), name='config-watch', daemon=True)
+        _watcher.start()
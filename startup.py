@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+# Startup timing: run with --startup-timing (or WEBDAV_MANAGER_STARTUP_TIMING=1)
+# and every process reports how long each startup phase took, e.g.
+#
+#   [startup gui] imports: 45 ms (total 45 ms)
+#   [startup w0] flask + werkzeug: 310 ms (total 322 ms)
+#
+# The environment variable is inherited by the server processes.
+
+ENABLED = '--startup-timing' in sys.argv or bool(os.environ.get('WEBDAV_MANAGER_STARTUP_TIMING'))
+if ENABLED:
+    os.environ['WEBDAV_MANAGER_STARTUP_TIMING'] = '1'
+
+_started = _last = time.perf_counter()
+_phases = []
+
+
+def mark(phase):
+    # End of a phase: time since the previous mark (or since this module was imported)
+    global _last
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    _phases.append((phase, now - _last, now - _started))
+    _last = now
+
+
+def report(label):
+    # Print and forget the phases recorded so far
+    for phase, took, total in _phases:
+        print(f"[startup {label}] {phase}: {took * 1000:.0f} ms (total {total * 1000:.0f} ms)")
+    _phases.clear()
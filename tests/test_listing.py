@@ -0,0 +1,17 @@
+from listing import ListingCache
+
+
+def test_rescan_without_changes_keeps_generation(tmp_path):
+    (tmp_path / 'a.txt').write_bytes(b'x')
+    cache = ListingCache(max_age=0)  # every read rescans
+    first = cache.generation(str(tmp_path))
+    assert cache.generation(str(tmp_path)) == first
+    assert [e.name for e in cache.entries(str(tmp_path))] == ['a.txt']
+
+
+def test_rescan_with_changes_bumps_generation(tmp_path):
+    cache = ListingCache(max_age=0)
+    first = cache.generation(str(tmp_path))
+    (tmp_path / 'b.txt').write_bytes(b'y')
+    assert cache.generation(str(tmp_path)) != first
+    assert [e.name for e in cache.entries(str(tmp_path))] == ['b.txt']
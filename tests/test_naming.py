@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from naming import NameIndex
+
+
+def test_reserve_free_name_creates_placeholder(tmp_path):
+    index = NameIndex()
+    assert index.reserve(str(tmp_path), 'bai.docx') == 'bai.docx'
+    assert (tmp_path / 'bai.docx').read_bytes() == b''
+
+
+def test_reserve_taken_name_gets_suffix(tmp_path):
+    (tmp_path / 'bai.docx').write_bytes(b'x')
+    index = NameIndex()
+    assert index.reserve(str(tmp_path), 'bai.docx') == 'bai_01.docx'
+    assert index.reserve(str(tmp_path), 'bai.docx') == 'bai_02.docx'
+    assert index.reserve(str(tmp_path), 'bai') == 'bai'
+    assert index.reserve(str(tmp_path), 'bai') == 'bai_01'
+
+
+def test_reserve_skips_files_created_behind_its_back(tmp_path):
+    index = NameIndex()
+    folder = str(tmp_path)
+    index.reserve(folder, 'a.txt')
+    (tmp_path / 'a_01.txt').write_bytes(b'someone else')
+    assert index.reserve(folder, 'a.txt') == 'a_02.txt'
+    assert (tmp_path / 'a_01.txt').read_bytes() == b'someone else'
+
+
+def test_release_frees_the_name(tmp_path):
+    index = NameIndex()
+    folder = str(tmp_path)
+    name = index.reserve(folder, 'a.txt')
+    os.remove(os.path.join(folder, name))
+    index.release(folder, name)
+    assert index.reserve(folder, 'a.txt') == 'a.txt'
+
+
+def test_invalidate_rescans_the_folder(tmp_path):
+    index = NameIndex()
+    folder = str(tmp_path)
+    index.reserve(folder, 'a.txt')
+    os.remove(os.path.join(folder, 'a.txt'))
+    index.invalidate(folder)
+    assert index.reserve(folder, 'a.txt') == 'a.txt'
+
+
+def test_reserve_refuses_an_empty_name(tmp_path):
+    with pytest.raises(ValueError):
+        NameIndex().reserve(str(tmp_path), '')
+    assert os.listdir(tmp_path) == []
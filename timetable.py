@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import bisect
+from datetime import datetime
+from collections import namedtuple
+
+# Submission windows ("sessions" in config.json): while a window is open,
+# student uploads go to its own subfolder of upload_folder; outside every
+# window submissions are closed. Each entry is either weekly
+#
+#   {"name": "10A1", "start": "07:00", "end": "08:30", "days": "mon,wed", "folder": "10A1"}
+#
+# ("days" defaults to every day, "folder" to the name) or a one-off window
+# with full dates, "start": "2026-12-20T09:00", which takes precedence over
+# the weekly ones. Where windows overlap, the one that started last wins.
+#
+# The table is built once per config load (stdlib only, like settings.py):
+# overlaps are resolved into sorted, disjoint segments, so finding the open
+# window for a request is a bisect, not a scan of the config.
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+DAY = 24 * 3600
+WEEK = 7 * DAY
+
+Window = namedtuple('Window', 'name folder path start end')
+
+
+def _seconds_of_day(value):
+    t = datetime.strptime(value, '%H:%M').time()
+    return t.hour * 3600 + t.minute * 60
+
+
+def _days(value):
+    if not value:
+        return range(7)
+    if isinstance(value, str):
+        value = value.split(',')
+    return sorted({DAYS.index(str(day).strip().lower()[:3]) for day in value})
+
+
+def _segments(intervals):
+    # (start, end, window) intervals -> disjoint (starts, segments), the latest start winning
+    points = sorted({p for start, end, _ in intervals for p in (start, end)})
+    segments = []
+    for lo, hi in zip(points, points[1:]):
+        covering = [(start, window) for start, end, window in intervals if start <= lo and hi <= end]
+        if not covering:
+            continue
+        window = max(covering, key=lambda c: c[0])[1]
+        if segments and segments[-1][1] == lo and segments[-1][2] is window:
+            segments[-1] = (segments[-1][0], hi, window)
+        else:
+            segments.append((lo, hi, window))
+    return [s[0] for s in segments], segments
+
+
+def _lookup(starts, segments, t):
+    i = bisect.bisect_right(starts, t) - 1
+    if i >= 0 and t < segments[i][1]:
+        return segments[i][2]
+    return None
+
+
+class Timetable:
+    def __init__(self, sessions, upload_folder):
+        self.windows = []
+        weekly = []
+        dated = []
+        for entry in sessions or ():
+            try:
+                window, intervals, is_dated = self._parse(entry, upload_folder)
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                print(f"Ignoring submission window {entry!r}: {e}", file=sys.stderr)
+                continue
+            self.windows.append(window)
+            (dated if is_dated else weekly).extend(intervals)
+        self._weekly_starts, self._weekly = _segments(weekly)
+        self._dated_starts, self._dated = _segments(dated)
+
+    def _parse(self, entry, upload_folder):
+        name = str(entry['name']).strip()
+        folder = os.path.basename(os.path.normpath(str(entry.get('folder') or name)))
+        if not name or folder.startswith('.'):
+            raise ValueError('needs a name and a folder that is not hidden')
+        window = Window(name, folder, os.path.join(upload_folder, folder), str(entry['start']), str(entry['end']))
+
+        if 'T' in window.start:
+            start = datetime.fromisoformat(window.start).timestamp()
+            end = datetime.fromisoformat(window.end).timestamp()
+            if end <= start:
+                raise ValueError('ends before it starts')
+            return window, [(start, end, window)], True
+
+        start = _seconds_of_day(window.start)
+        end = _seconds_of_day(window.end)
+        if end <= start:
+            end += DAY  # runs past midnight
+        intervals = []
+        for day in _days(entry.get('days')):
+            s, e = day * DAY + start, day * DAY + end
+            if e > WEEK:
+                # Sunday night into Monday morning
+                intervals.append((0, e - WEEK, window))
+                e = WEEK
+            intervals.append((s, e, window))
+        return window, intervals, False
+
+    def __bool__(self):
+        return bool(self.windows)
+
+    def active(self, now=None):
+        # The open Window at now (default: current time), or None
+        now = time.time() if now is None else now
+        window = _lookup(self._dated_starts, self._dated, now)
+        if window is not None:
+            return window
+        lt = time.localtime(now)
+        return _lookup(self._weekly_starts, self._weekly, lt.tm_wday * DAY + lt.tm_hour * 3600 + lt.tm_min * 60 + lt.tm_sec)
+
+    def accepts(self, folder, now=None, grace=0):
+        # False if folder belongs to a window that closed more than grace seconds before now
+        window = next((w for w in self.windows if w.path == folder), None)
+        if window is None:
+            return True
+        now = time.time() if now is None else now
+        return window in (self.active(now), self.active(now - grace))
+
+    def find(self, name):
+        return next((w for w in self.windows if w.name == name), None)
@@ -0,0 +1,350 @@
+import os
+import shutil
+import hashlib
+import secrets
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from werkzeug.http import http_date
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Request, Response
+
+from fileserve import etag_for, serve_file
+from metrics import ENDPOINT_KEY
+
+# Minimal WebDAV (class 1 + fake class 2 locks) over the submission folder, so
+# lab machines can map it as a network drive:
+#
+#   student share - anonymous, write-only: PUT drops a submission through the
+#                   normal naming/ledger path; nothing can be listed or read.
+#   admin share   - Basic auth with the admin credentials from config.json:
+#                   PROPFIND (Depth 0/1), GET/HEAD, PUT, MKCOL, DELETE.
+#
+# PROPFIND answers come from the shared ListingCache, and every resource
+# carries getetag/getlastmodified so the Windows WebDAV redirector can skip
+# files it already has.
+#
+# Explorer copies a file onto the student share as PROPFIND (404), an empty
+# PUT, LOCK, the real PUT, PROPPATCH and a final PROPFIND. The empty PUT is
+# not stored: it is only remembered for that client, so the real PUT becomes
+# the one submission and the final PROPFIND finds it. Every PUT with content
+# is a new submission under a free name; nothing is ever overwritten.
+
+CHUNK_SIZE = 64 * 1024
+CREATED_SECONDS = 60  # how long PROPFIND from a client still finds the name it just PUT
+DAV_NS = 'DAV:'
+
+
+def _multistatus(responses):
+    body = ['<?xml version="1.0" encoding="utf-8"?>\n<D:multistatus xmlns:D="DAV:">']
+    body.extend(responses)
+    body.append('</D:multistatus>')
+    return Response(''.join(body), status=207, mimetype='application/xml', headers={'DAV': '1, 2'})
+
+
+def _prop_response(href, name, is_dir, size=0, mtime=0, mtime_ns=0):
+    props = [f'<D:displayname>{escape(name)}</D:displayname>']
+    if is_dir:
+        props.append('<D:resourcetype><D:collection/></D:resourcetype>')
+    else:
+        props.append('<D:resourcetype/>')
+        props.append(f'<D:getcontentlength>{size}</D:getcontentlength>')
+        props.append(f'<D:getetag>"{etag_for(size, mtime_ns)}"</D:getetag>')
+        props.append('<D:getcontenttype>application/octet-stream</D:getcontenttype>')
+    if mtime:
+        props.append(f'<D:getlastmodified>{http_date(int(mtime))}</D:getlastmodified>')
+        created = datetime.fromtimestamp(mtime, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        props.append(f'<D:creationdate>{created}</D:creationdate>')
+    props.append('<D:supportedlock><D:lockentry><D:lockscope><D:exclusive/></D:lockscope>'
+                 '<D:locktype><D:write/></D:locktype></D:lockentry></D:supportedlock>')
+    return (f'<D:response><D:href>{escape(href)}</D:href><D:propstat><D:prop>{"".join(props)}</D:prop>'
+            '<D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>')
+
+
+class WebDAVApp:
+    def __init__(self, get_root, store, listing, is_hidden, admin=False,
+                 check_auth=None, get_max_bytes=None, on_delete=None, on_write=None):
+        # get_root()                     -> absolute folder served at the mount point
+        #                                   (None: student share while submissions are closed)
+        # store(temp, name, ip, sha256)  -> stored name (student PUT)
+        # check_auth(user, password)     -> bool (admin share only)
+        # on_delete(folder, name)        -> keep name index / caches in sync
+        # on_write(path)                 -> admin PUT stored a file at path
+        self.get_root = get_root
+        self.store = store
+        self.listing = listing
+        self.is_hidden = is_hidden
+        self.admin = admin
+        self.check_auth = check_auth
+        self.get_max_bytes = get_max_bytes
+        self.on_delete = on_delete
+        self.on_write = on_write
+        self._created = {}  # (client ip, root, requested name) -> (stored name or None, expires)
+        self._created_lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        environ[ENDPOINT_KEY] = 'webdav_admin' if self.admin else 'webdav'  # metrics route label
+        request = Request(environ)
+        if self.admin:
+            auth = request.authorization
+            if auth is None or not self.check_auth(auth.username, auth.password):
+                response = Response('Unauthorized', status=401,
+                                    headers={'WWW-Authenticate': 'Basic realm="WebDAV Manager"'})
+                return response(environ, start_response)
+
+        handler = getattr(self, 'do_' + request.method.upper(), None)
+        if handler is None:
+            response = Response('Method Not Allowed', status=405, headers={'Allow': self._allowed()})
+        else:
+            response = handler(request)
+        return response(environ, start_response)
+
+    # --- helpers -----------------------------------------------------------
+
+    def _allowed(self):
+        if self.admin:
+            return 'OPTIONS, PROPFIND, PROPPATCH, GET, HEAD, PUT, MKCOL, DELETE, LOCK, UNLOCK'
+        return 'OPTIONS, PROPFIND, PROPPATCH, PUT, LOCK, UNLOCK'
+
+    def _forbidden(self):
+        return Response('Forbidden', status=403)
+
+    def _resolve(self, request):
+        # (root, relative path, absolute path); absolute is None if the path escapes the root
+        root = self.get_root()
+        rel = unquote(request.path).strip('/')
+        if root is None:
+            return root, rel, None
+        if not rel:
+            return root, '', root
+        if any(self.is_hidden(part) for part in rel.split('/')):
+            return root, rel, None
+        return root, rel, safe_join(root, rel)
+
+    def _created_key(self, request, root, rel):
+        return request.remote_addr, root, rel
+
+    def _recall(self, key):
+        # (created, stored name): created if this client PUT the name recently;
+        # stored is None while it has only sent the empty placeholder
+        with self._created_lock:
+            entry = self._created.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def _remember(self, key, stored):
+        now = time.monotonic()
+        with self._created_lock:
+            for old in [k for k, entry in self._created.items() if entry[1] < now]:
+                del self._created[old]
+            self._created[key] = (stored, now + CREATED_SECONDS)
+
+    def _href(self, request, rel, is_dir=False):
+        href = request.script_root + '/' + quote(rel)
+        if is_dir and not href.endswith('/'):
+            href += '/'
+        return href
+
+    def _receive(self, request, folder):
+        # Stream the request body into a temp file inside folder; returns (path, sha256)
+        limit = self.get_max_bytes() if self.get_max_bytes else None
+        if limit and request.content_length and request.content_length > limit:
+            return None, None
+        sha256 = hashlib.sha256()
+        received = 0
+        try:
+            temp = tempfile.NamedTemporaryFile('wb', dir=folder, prefix='.upload-', suffix='.part', delete=False)
+        except FileNotFoundError:
+            # The share's folder was removed while the server runs
+            os.makedirs(folder, exist_ok=True)
+            temp = tempfile.NamedTemporaryFile('wb', dir=folder, prefix='.upload-', suffix='.part', delete=False)
+        with temp as f:
+            try:
+                while True:
+                    chunk = request.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    received += len(chunk)
+                    if limit and received > limit:
+                        raise ValueError('too large')
+                    f.write(chunk)
+                    sha256.update(chunk)
+            except (OSError, ValueError):
+                f.close()
+                os.remove(f.name)
+                return None, None
+        return f.name, sha256.hexdigest()
+
+    # --- methods -----------------------------------------------------------
+
+    def do_OPTIONS(self, request):
+        return Response(status=200, headers={'DAV': '1, 2', 'Allow': self._allowed(), 'MS-Author-Via': 'DAV'})
+
+    def do_PROPFIND(self, request):
+        root, rel, path = self._resolve(request)
+        if not self.admin:
+            # Write-only drop box: the collection itself exists, its contents are
+            # invisible except for a name the asking client has just written
+            if not rel:
+                return _multistatus([_prop_response(self._href(request, '', True), 'Nộp bài', True)])
+            created, stored = self._recall(self._created_key(request, root, rel))
+            if not created:
+                return Response('Not Found', status=404)
+            if stored is None:
+                return _multistatus([_prop_response(self._href(request, rel), rel, False, mtime=time.time())])
+            try:
+                st = os.stat(os.path.join(root, stored))
+            except OSError:
+                return Response('Not Found', status=404)
+            return _multistatus([_prop_response(self._href(request, rel), rel, False,
+                                                st.st_size, st.st_mtime, st.st_mtime_ns)])
+
+        if path is None:
+            return Response('Not Found', status=404)
+        depth = request.headers.get('Depth', '1')
+
+        if not os.path.exists(path):
+            return Response('Not Found', status=404)
+        if not os.path.isdir(path):
+            st = os.stat(path)
+            return _multistatus([_prop_response(self._href(request, rel), os.path.basename(path), False,
+                                                st.st_size, st.st_mtime, st.st_mtime_ns)])
+
+        st = os.stat(path)
+        responses = [_prop_response(self._href(request, rel, True), os.path.basename(path) or '/', True,
+                                    mtime=st.st_mtime)]
+        if depth != '0':
+            prefix = rel + '/' if rel else ''
+            for entry in self.listing.entries(path):
+                responses.append(_prop_response(self._href(request, prefix + entry.name, entry.is_dir), entry.name,
+                                                entry.is_dir, entry.size, entry.mtime, entry.mtime_ns))
+        return _multistatus(responses)
+
+    def do_PROPPATCH(self, request):
+        # Windows sets Win32 timestamps/attributes after a copy; accept and ignore them
+        root, rel, path = self._resolve(request)
+        if path is None:
+            return Response('Not Found', status=404)
+        props = []
+        try:
+            tree = ET.fromstring(request.get_data() or b'<x/>')
+            for prop in tree.iter('{%s}prop' % DAV_NS):
+                for child in prop:
+                    ns, _, local = child.tag[1:].partition('}')
+                    props.append(f'<x:{local} xmlns:x="{escape(ns)}"/>')
+        except ET.ParseError:
+            return Response('Bad Request', status=400)
+        return _multistatus([f'<D:response><D:href>{escape(self._href(request, rel))}</D:href><D:propstat>'
+                             f'<D:prop>{"".join(props)}</D:prop><D:status>HTTP/1.1 200 OK</D:status>'
+                             '</D:propstat></D:response>'])
+
+    def do_GET(self, request):
+        if not self.admin:
+            return self._forbidden()
+        root, rel, path = self._resolve(request)
+        if path is None or not os.path.isfile(path):
+            return Response('Not Found', status=404)
+        return serve_file(request.environ, path)
+
+    do_HEAD = do_GET
+
+    def do_PUT(self, request):
+        root, rel, path = self._resolve(request)
+        if root is None:
+            # Outside every submission window; refused before the body is read
+            return Response('Submissions are closed', status=403)
+        if path is None or not rel:
+            return self._forbidden()
+        folder = os.path.dirname(path)
+
+        if not self.admin:
+            # Students can only drop files at the top level, under a name of our choosing
+            if '/' in rel:
+                return self._forbidden()
+            key = self._created_key(request, root, rel)
+            created, stored = self._recall(key)
+            placeholder = created and stored is None
+            temp_path, sha256 = self._receive(request, folder)
+            if temp_path is None:
+                return Response('Request Entity Too Large', status=413)
+            if os.path.getsize(temp_path) == 0:
+                # Explorer's placeholder before the real content; nothing to submit yet
+                os.remove(temp_path)
+                self._remember(key, None)
+                return Response(status=201)
+            stored = self.store(temp_path, rel, request.remote_addr, sha256)
+            # Only for the PROPFIND that follows; the next PUT is a new submission again
+            self._remember(key, stored)
+            return Response(status=204 if placeholder else 201, headers={'Location': self._href(request, stored)})
+
+        if not os.path.isdir(folder):
+            return Response('Conflict', status=409)
+        if os.path.isdir(path):
+            return Response('Method Not Allowed', status=405)
+        existed = os.path.exists(path)
+        temp_path, _ = self._receive(request, folder)
+        if temp_path is None:
+            return Response('Request Entity Too Large', status=413)
+        os.replace(temp_path, path)
+        self.listing.add(folder, os.path.basename(path))
+        if self.on_write:
+            self.on_write(path)
+        return Response(status=204 if existed else 201)
+
+    def do_MKCOL(self, request):
+        if not self.admin:
+            return self._forbidden()
+        root, rel, path = self._resolve(request)
+        if path is None or not rel:
+            return self._forbidden()
+        if request.content_length:
+            return Response('Unsupported Media Type', status=415)
+        if os.path.exists(path):
+            return Response('Method Not Allowed', status=405)
+        parent = os.path.dirname(path)
+        if not os.path.isdir(parent):
+            return Response('Conflict', status=409)
+        os.mkdir(path)
+        self.listing.add(parent, os.path.basename(path))
+        return Response(status=201)
+
+    def do_DELETE(self, request):
+        if not self.admin:
+            return self._forbidden()
+        root, rel, path = self._resolve(request)
+        if path is None or not rel:
+            return self._forbidden()
+        if not os.path.exists(path):
+            return Response('Not Found', status=404)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            self.listing.invalidate(path)
+        else:
+            os.remove(path)
+        folder, name = os.path.split(path)
+        if self.on_delete:
+            self.on_delete(folder, name)
+        return Response(status=204)
+
+    def do_LOCK(self, request):
+        # Windows and Office refuse to write without a lock; hand out a token without enforcing it
+        root, rel, path = self._resolve(request)
+        if path is None:
+            return self._forbidden()
+        token = 'opaquelocktoken:' + secrets.token_hex(16)
+        body = ('<?xml version="1.0" encoding="utf-8"?>\n<D:prop xmlns:D="DAV:"><D:lockdiscovery><D:activelock>'
+                '<D:locktype><D:write/></D:locktype><D:lockscope><D:exclusive/></D:lockscope>'
+                '<D:depth>0</D:depth><D:timeout>Second-3600</D:timeout>'
+                f'<D:locktoken><D:href>{token}</D:href></D:locktoken>'
+                f'<D:lockroot><D:href>{escape(self._href(request, rel))}</D:href></D:lockroot>'
+                '</D:activelock></D:lockdiscovery></D:prop>')
+        return Response(body, status=200, mimetype='application/xml', headers={'Lock-Token': f'<{token}>'})
+
+    def do_UNLOCK(self, request):
+        return Response(status=204)
@@ -0,0 +1,67 @@
+import os
+import zipfile
+
+# Streams a ZIP archive as it is built: no temp archive on disk and constant
+# memory whatever the total size. zipfile writes to a non-seekable sink, so it
+# emits data descriptors after each entry and the central directory at the end.
+
+CHUNK_SIZE = 1024 * 1024
+
+# Formats that are already compressed: deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp',
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp3', '.m4a', '.aac', '.ogg', '.mp4', '.mov', '.avi', '.mkv', '.webm',
+    '.sb3', '.apk', '.jar',
+}
+
+
+class _Sink:
+    # Write-only file object zipfile writes into; the generator drains it
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def compress_type(arcname):
+    ext = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def iter_zip(files):
+    # files: iterable of (path, arcname); unreadable files are skipped
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as zf:
+        for path, arcname in files:
+            try:
+                src = open(path, 'rb')
+            except OSError:
+                continue
+            with src:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = compress_type(arcname)
+                with zf.open(info, 'w') as dst:
+                    while True:
+                        chunk = src.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        data = sink.take()
+                        if data:
+                            yield data
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()